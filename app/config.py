@@ -1,10 +1,8 @@
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-from openai import OpenAI
 
 env_path = Path(__file__).resolve().parents[1] / '.env'
-print(f".env !!!!!!!! {env_path}")
 
 load_dotenv(dotenv_path=env_path)
 
@@ -20,4 +18,89 @@ if not SECRET_KEY:
     raise ValueError("SECRET_KEY is not set in the environment variables.")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+
+# Keep-alive ping, e.g. for a free-tier host that sleeps when idle (off unless a URL is set)
+KEEPALIVE_URL = os.getenv("KEEPALIVE_URL")
+KEEPALIVE_INTERVAL_SECONDS = float(os.getenv("KEEPALIVE_INTERVAL_SECONDS", 600))
+
+# Lesson generation jobs: a running job's lease is renewed while it runs; once it lapses
+# (the process died) the job is queued again, at most until it has been started this many times
+GENERATION_JOB_LEASE_SECONDS = float(os.getenv("GENERATION_JOB_LEASE_SECONDS", 300))
+GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv("GENERATION_JOB_MAX_ATTEMPTS", 3))
+
+# Curriculum generation
+CURRICULUM_CONCURRENCY = int(os.getenv("CURRICULUM_CONCURRENCY", 4))
+CURRICULUM_MAX_LESSONS = int(os.getenv("CURRICULUM_MAX_LESSONS", 20))
+
+# Generated lesson cache
+LESSON_CACHE_PATH = os.getenv("LESSON_CACHE_PATH", "lesson_cache.db")
+LESSON_CACHE_TTL_SECONDS = int(os.getenv("LESSON_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LESSON_CACHE_MEMORY_SIZE = int(os.getenv("LESSON_CACHE_MEMORY_SIZE", 256))
+LESSON_CACHE_DISK_SIZE = int(os.getenv("LESSON_CACHE_DISK_SIZE", 5000))
+
+# Lesson audio rendering
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", 2))
+AUDIO_MAX_ATTEMPTS = int(os.getenv("AUDIO_MAX_ATTEMPTS", 3))
+AUDIO_RETRY_DELAY_SECONDS = float(os.getenv("AUDIO_RETRY_DELAY_SECONDS", 5))
+AUDIO_BLOCK_CONCURRENCY = int(os.getenv("AUDIO_BLOCK_CONCURRENCY", 4))
+# A render claimed this long ago is presumed dead (its process stopped) and may be claimed again
+AUDIO_RENDER_TIMEOUT_SECONDS = float(os.getenv("AUDIO_RENDER_TIMEOUT_SECONDS", 1800))
+# Cached block audio no lesson audio was joined from is deleted at startup after this long
+AUDIO_ORPHAN_BLOCK_AGE_SECONDS = float(os.getenv("AUDIO_ORPHAN_BLOCK_AGE_SECONDS", 86400))
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+# Defaults to DATABASE_URL with its async driver (aiosqlite / asyncpg)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB
+
+# Lesson listing pagination
+LESSONS_PAGE_SIZE = int(os.getenv("LESSONS_PAGE_SIZE", 50))
+LESSONS_MAX_PAGE_SIZE = int(os.getenv("LESSONS_MAX_PAGE_SIZE", 200))
+
+# Lesson export and import (NDJSON)
+LESSON_TRANSFER_BATCH_SIZE = int(os.getenv("LESSON_TRANSFER_BATCH_SIZE", 500))
+LESSON_IMPORT_MAX_LINE_BYTES = int(os.getenv("LESSON_IMPORT_MAX_LINE_BYTES", 1024 * 1024))
+
+# Verification codes ("database" works across instances, "memory" for a single node)
+VERIFICATION_CODE_STORE = os.getenv("VERIFICATION_CODE_STORE", "database")
+VERIFICATION_CODE_TTL_SECONDS = int(os.getenv("VERIFICATION_CODE_TTL_SECONDS", 600))
+VERIFICATION_PURGE_INTERVAL_SECONDS = float(os.getenv("VERIFICATION_PURGE_INTERVAL_SECONDS", 300))
+
+# Password hashing
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+# Authentication caches
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", 10000))
+USER_PROFILE_CACHE_TTL_SECONDS = float(os.getenv("USER_PROFILE_CACHE_TTL_SECONDS", 60))
+
+# Outgoing email
+MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "true").lower() == "true"
+MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME", "Basalt")
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 20))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_RETRY_DELAY_SECONDS = float(os.getenv("EMAIL_RETRY_DELAY_SECONDS", 2))
+EMAIL_IDLE_TIMEOUT_SECONDS = float(os.getenv("EMAIL_IDLE_TIMEOUT_SECONDS", 60))
+
+# Quiz grading
+ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", 5000))
+ANSWER_KEY_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_KEY_CACHE_TTL_SECONDS", 300))
+QUIZ_BATCH_MAX_SUBMISSIONS = int(os.getenv("QUIZ_BATCH_MAX_SUBMISSIONS", 500))
+
+# Response cache for lesson, quiz and question reads
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 10000))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))
+# Cached responses smaller than this are sent uncompressed
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", 1024))
@@ -1,16 +1,26 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from ..config import DATABASE_URL, ASYNC_DATABASE_URL
+from .engine import create_db_engine, create_async_db_engine, to_async_url
+
 Base = declarative_base()
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+# Same database through an async driver (aiosqlite here, asyncpg for Postgres)
+ASYNC_SQLALCHEMY_DATABASE_URL = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+
+# Objects stay usable after commit; async sessions cannot lazily reload expired attributes
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +28,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
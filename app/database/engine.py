@@ -0,0 +1,213 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE,
+)
+
+# Async driver per backend, used to derive the async engine URL from DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+class PoolMetrics:
+    """
+    Counters for one connection pool: how long callers waited to check a
+    connection out, how long connections were held, and how often the pool ran dry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.held_seconds_total = 0.0
+        self.held_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_held(self, seconds: float):
+        with self._lock:
+            self.held_seconds_total += seconds
+            self.held_seconds_max = max(self.held_seconds_max, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "wait_ms_avg": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "held_ms_avg": round(self.held_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "held_ms_max": round(self.held_seconds_max * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout. The metrics object is carried over when the engine
+    recreates its pool (e.g. after `dispose()`), so counters are not lost.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def status_dict(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            **self.metrics.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def to_async_url(url: str) -> str:
+    """
+    The same database URL with the async driver (aiosqlite / asyncpg) selected.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases.")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return _is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+
+def _engine_options(url: str, poolclass) -> dict:
+    if _is_sqlite_memory(url):
+        # In-memory databases live in a single connection; keep SQLAlchemy's default pool
+        return {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+    }
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_recycle"] = DB_POOL_RECYCLE_SECONDS
+        options["pool_pre_ping"] = True
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; busy_timeout makes writers wait instead of failing
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(SQLITE_CACHE_SIZE)}")
+    cursor.close()
+
+
+def _instrument(engine: Engine, url: str):
+    if _is_sqlite(url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+    def on_connect(dbapi_connection, connection_record):
+        metrics = getattr(engine.pool, "metrics", None)
+        if metrics:
+            metrics.record_connect()
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        metrics = getattr(engine.pool, "metrics", None)
+        if checked_out_at is not None and metrics:
+            metrics.record_held(time.perf_counter() - checked_out_at)
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+
+def create_db_engine(url: str) -> Engine:
+    """
+    Engine for `url`: SQLite gets WAL and the tuned pragmas, server databases
+    get a sized, recycled and pre-pinged pool. Both report pool metrics.
+    """
+    engine = create_engine(url, **_engine_options(url, InstrumentedQueuePool))
+    _instrument(engine, url)
+    return engine
+
+
+def create_async_db_engine(url: str) -> AsyncEngine:
+    """
+    Async counterpart of `create_db_engine`; `url` must already name an async driver.
+    """
+    engine = create_async_engine(url, **_engine_options(url, InstrumentedAsyncQueuePool))
+    _instrument(engine.sync_engine, url)
+    return engine
+
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, _InstrumentedPoolMixin):
+        return pool.status_dict()
+    return {"status": pool.status()}
@@ -7,6 +7,11 @@ from sqlalchemy import (
     Enum,
     ForeignKey,
     JSON,
+    Index,
+    Boolean,
+    delete,
+    event,
+    select,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -22,6 +27,7 @@ class User(Base):
     password_hashed = Column(String, nullable=False)
 
     lessons = relationship("Lesson", back_populates="user")
+    generation_jobs = relationship("GenerationJob", back_populates="user")
     verification_codes = relationship("VerificationCode", back_populates="user")
 
     def __repr__(self):
@@ -38,10 +44,23 @@ class Lesson(Base):
     position = Column(Integer, nullable=True)
     content = Column(JSON, nullable=True)
     audio_file_path = Column(String(255), nullable=True)
+    audio_hash = Column(String(64), nullable=True)
+    audio_status = Column(
+        Enum("pending", "rendering", "ready", "failed", name="audio_statuses"), nullable=True, index=True
+    )
+    # When the current render claimed the lesson; see AUDIO_RENDER_TIMEOUT_SECONDS
+    audio_render_started_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="lessons")
     quiz = relationship("Quiz", back_populates="lesson", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # A user's lessons, and the last position among them
+        Index("ix_lessons_user_id_position", "user_id", "position"),
+        # Keyset pagination of a user's lessons by lesson_id
+        Index("ix_lessons_user_id_lesson_id", "user_id", "lesson_id"),
+    )
+
     def __repr__(self):
         return f"<Lesson(lesson_id={self.lesson_id}, title='{self.title}')>"
 
@@ -50,7 +69,7 @@ class Quiz(Base):
     __tablename__ = "quizzes"
 
     quiz_id = Column(Integer, primary_key=True, index=True)
-    lesson_id = Column(Integer, ForeignKey("lessons.lesson_id"))
+    lesson_id = Column(Integer, ForeignKey("lessons.lesson_id"), index=True)
     title = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
 
@@ -65,7 +84,7 @@ class Question(Base):
     __tablename__ = "questions"
 
     question_id = Column(Integer, primary_key=True, index=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.quiz_id"))
+    quiz_id = Column(Integer, ForeignKey("quizzes.quiz_id"), index=True)
     question_text = Column(Text, nullable=False)
     question_type = Column(
         Enum("multiple_choice", "true_false", name="question_types"), nullable=False
@@ -83,10 +102,155 @@ class VerificationCode(Base):
     __tablename__ = "verification_codes"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True)
-    email = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True, index=True)
+    email = Column(String, nullable=False)
     code = Column(String, nullable=False)
     purpose = Column(String, nullable=False)  # 'registration' or 'login' or 'reset'
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     
-    user = relationship("User", back_populates="verification_codes")
\ No newline at end of file
+    user = relationship("User", back_populates="verification_codes")
+
+    __table_args__ = (
+        # Covers verify_code; its email prefix also serves lookups by email alone
+        Index("ix_verification_codes_lookup", "email", "purpose", "code", "expires_at"),
+    )
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    job_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
+    learning_field = Column(String(255), nullable=False)
+    description = Column(Text, nullable=False)
+    status = Column(
+        Enum("queued", "running", "succeeded", "failed", name="generation_job_statuses"),
+        nullable=False,
+        default="queued",
+        index=True,
+    )
+    lesson_id = Column(Integer, ForeignKey("lessons.lesson_id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Process running the job; it renews updated_at as its lease while it runs
+    worker_id = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User", back_populates="generation_jobs")
+
+    def __repr__(self):
+        return f"<GenerationJob(job_id={self.job_id}, status='{self.status}')>"
+
+
+class AudioAsset(Base):
+    __tablename__ = "audio_assets"
+
+    content_hash = Column(String(64), primary_key=True)
+    file_path = Column(String(255), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AudioAsset(content_hash='{self.content_hash}', ref_count={self.ref_count})>"
+
+
+class AudioAssetBlock(Base):
+    """
+    A content block synthesized into an audio asset. The block's cached MP3 is kept
+    while any asset lists it, so unchanged blocks are reused when a lesson is edited.
+    """
+
+    __tablename__ = "audio_asset_blocks"
+
+    content_hash = Column(
+        String(64), ForeignKey("audio_assets.content_hash", ondelete="CASCADE"), primary_key=True
+    )
+    block_hash = Column(String(64), primary_key=True, index=True)
+
+
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+
+    attempt_id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.quiz_id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False, index=True)
+    total_questions = Column(Integer, nullable=False)
+    correct_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<QuizAttempt(attempt_id={self.attempt_id}, quiz_id={self.quiz_id})>"
+
+
+class QuizAttemptAnswer(Base):
+    __tablename__ = "quiz_attempt_answers"
+
+    attempt_id = Column(
+        Integer, ForeignKey("quiz_attempts.attempt_id", ondelete="CASCADE"), primary_key=True
+    )
+    # Not a foreign key: answers stay in the history after their question is deleted
+    question_id = Column(Integer, primary_key=True)
+    answer = Column(String(255), nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+
+
+class QuizStats(Base):
+    __tablename__ = "quiz_stats"
+
+    quiz_id = Column(Integer, ForeignKey("quizzes.quiz_id", ondelete="CASCADE"), primary_key=True)
+    attempt_count = Column(Integer, nullable=False, default=0)
+    answer_count = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.question_id", ondelete="CASCADE"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.quiz_id", ondelete="CASCADE"), nullable=False, index=True)
+    attempt_count = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+
+
+class QuestionAnswerStats(Base):
+    __tablename__ = "question_answer_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.question_id", ondelete="CASCADE"), primary_key=True)
+    answer = Column(String(255), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.quiz_id", ondelete="CASCADE"), nullable=False, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ResponseVersion(Base):
+    """
+    How often the data behind a response cache scope has changed. Kept in the database
+    so every worker process sees a write made by another one.
+    """
+
+    __tablename__ = "response_versions"
+
+    scope = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Quizzes and questions are usually deleted through ORM cascades (lesson -> quiz ->
+# questions), and SQLite does not enforce ON DELETE CASCADE by default, so their
+# attempt history and statistics are removed here in bulk instead of being loaded.
+
+
+@event.listens_for(Question, "before_delete")
+def _delete_question_stats(mapper, connection, question):
+    connection.execute(delete(QuestionAnswerStats).where(QuestionAnswerStats.question_id == question.question_id))
+    connection.execute(delete(QuestionStats).where(QuestionStats.question_id == question.question_id))
+
+
+@event.listens_for(Quiz, "before_delete")
+def _delete_quiz_history(mapper, connection, quiz):
+    attempt_ids = select(QuizAttempt.attempt_id).where(QuizAttempt.quiz_id == quiz.quiz_id)
+    connection.execute(delete(QuizAttemptAnswer).where(QuizAttemptAnswer.attempt_id.in_(attempt_ids)))
+    connection.execute(delete(QuizAttempt).where(QuizAttempt.quiz_id == quiz.quiz_id))
+    connection.execute(delete(QuestionAnswerStats).where(QuestionAnswerStats.quiz_id == quiz.quiz_id))
+    connection.execute(delete(QuestionStats).where(QuestionStats.quiz_id == quiz.quiz_id))
+    connection.execute(delete(QuizStats).where(QuizStats.quiz_id == quiz.quiz_id))
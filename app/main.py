@@ -1,59 +1,116 @@
-import threading
-import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 
-import requests
+from app.config import (
+    AUDIO_RENDER_TIMEOUT_SECONDS,
+    GENERATION_JOB_LEASE_SECONDS,
+    KEEPALIVE_URL,
+    KEEPALIVE_INTERVAL_SECONDS,
+)
+from app.database.base import async_engine, engine
 from app.routers.auth import router as auth_router
-from app.routers.generate import router as generate_router
+from app.routers.generate import (
+    router as generate_router,
+    generation_workers,
+    resume_generation_jobs,
+)
 from app.routers.lessons import router as lessons_router
 from app.routers.quizzes import router as quizzes_router
 from app.routers.questions import router as questions_router
+from app.routers.metrics import router as metrics_router
+from app.utils.audio_pipeline import audio_workers, purge_orphan_audio_blocks, resume_audio_renders
+from app.utils.verification_codes import verification_codes
+from app.utils.security import password_hasher
+from app.utils.email_utils import email_outbox
+from app.utils.job_queue import resume_periodically
+from app.utils.keepalive import ping_forever
+from app.utils.lesson_generator import lesson_cache
+from app.utils.openai_clients import openai_clients
+from app.utils.tts import ensure_audio_dirs
 
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
 
-# Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all HTTP methods
-    allow_headers=["*"],  # Allows all headers
-)
-
-# Include routers
-app.include_router(auth_router, prefix="/auth", tags=["auth"])
-app.include_router(generate_router, prefix="/generate", tags=["generate"])
-app.include_router(lessons_router, prefix="/lessons", tags=["lessons"])
-app.include_router(quizzes_router, prefix="/quizzes", tags=["quizzes"])
-app.include_router(questions_router, prefix="/questions", tags=["questions"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker process after any fork; nothing below is started at import time
+    ensure_audio_dirs()
+    # Pick up queued generation jobs, and running ones whose worker's lease has expired
+    resumed = resume_generation_jobs()
+    if resumed:
+        logger.info(f"Resumed {resumed} generation job(s)")
+    resumed = resume_audio_renders()
+    if resumed:
+        logger.info(f"Resumed {resumed} audio render(s)")
+    purged = await asyncio.to_thread(purge_orphan_audio_blocks)
+    if purged:
+        logger.info(f"Deleted {purged} unused audio block file(s)")
+    # Expired verification codes are deleted in bulk instead of accumulating
+    background_tasks = [asyncio.create_task(verification_codes.sweep_forever())]
+    # Jobs and renders of a worker that died are picked up once their lease or claim expires
+    background_tasks += [
+        asyncio.create_task(
+            resume_periodically(resume_generation_jobs, GENERATION_JOB_LEASE_SECONDS, "generate")
+        ),
+        asyncio.create_task(resume_periodically(resume_audio_renders, AUDIO_RENDER_TIMEOUT_SECONDS, "audio")),
+    ]
+    if KEEPALIVE_URL:
+        background_tasks.append(asyncio.create_task(ping_forever(KEEPALIVE_URL, KEEPALIVE_INTERVAL_SECONDS)))
+    email_outbox.start()
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await email_outbox.stop()
+    generation_workers.shutdown(wait=False)
+    audio_workers.shutdown(wait=False)
+    password_hasher.shutdown(wait=False)
+    await openai_clients.close()
+    lesson_cache.close()
+    await async_engine.dispose()
+    engine.dispose()
 
 
-@app.get("/")
 def root():
     return {"message": "Service is running"}
 
 
-@app.get("/healthcheck")
 def health_check():
     return {"status": "ok"}
 
 
-# ping
-def send_ping():
-    while True:
-        try:
-            response = requests.get("https://basalt-tst.onrender.com/docs")
-            print(f"Ping status: {response.status_code}")
-        except Exception as e:
-            print(f"Failed to ping the server: {e}")
-        time.sleep(600)  # Sleep 10 minutes
+def create_app() -> FastAPI:
+    """
+    Build the application. Clients, executors and background tasks are created by
+    the lifespan or on first use, so building (or importing) the app has no side
+    effects and is safe before a server forks its workers.
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    # Middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allows all origins
+        allow_credentials=True,
+        allow_methods=["*"],  # Allows all HTTP methods
+        allow_headers=["*"],  # Allows all headers
+    )
+
+    # Include routers
+    app.include_router(auth_router, prefix="/auth", tags=["auth"])
+    app.include_router(generate_router, prefix="/generate", tags=["generate"])
+    app.include_router(lessons_router, prefix="/lessons", tags=["lessons"])
+    app.include_router(quizzes_router, prefix="/quizzes", tags=["quizzes"])
+    app.include_router(questions_router, prefix="/questions", tags=["questions"])
+    app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
+
+    app.get("/")(root)
+    app.get("/healthcheck")(health_check)
+    return app
 
 
-# Run ping thread
-ping_thread = threading.Thread(target=send_ping)
-ping_thread.daemon = True
-ping_thread.start()
+app = create_app()
@@ -0,0 +1,184 @@
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import (
+    Question,
+    QuestionAnswerStats,
+    QuestionStats,
+    QuizAttempt,
+    QuizAttemptAnswer,
+    QuizStats,
+)
+from ..utils.answer_keys import AnswerKey
+
+MAX_ANSWER_LENGTH = 255
+
+
+class AsyncQuizAttemptsRepository:
+    """
+    Graded quiz attempts and the per-quiz and per-question summaries derived from them.
+
+    Recording attempts also adds them to the summary tables in the same transaction,
+    so reading statistics never has to look at the attempt history.
+    """
+
+    async def record_attempts(
+        self,
+        db: AsyncSession,
+        quiz_id: int,
+        user_id: int,
+        answer_key: AnswerKey,
+        graded: list[list[tuple[int, str, bool]]],
+    ) -> list[int]:
+        """
+        Store one attempt per entry of `graded` (the output of `AnswerKey.check`)
+        and commit. Returns the new attempt IDs in the same order.
+        """
+        now = datetime.utcnow()
+        graded = [
+            [(question_id, answer[:MAX_ANSWER_LENGTH], is_correct) for question_id, answer, is_correct in outcomes]
+            for outcomes in graded
+        ]
+        # sort_by_parameter_order returns the IDs in the order of `graded`
+        attempt_ids = (
+            await db.scalars(
+                insert(QuizAttempt).returning(QuizAttempt.attempt_id, sort_by_parameter_order=True),
+                [
+                    {
+                        "quiz_id": quiz_id,
+                        "user_id": user_id,
+                        "total_questions": answer_key.total_questions,
+                        "correct_count": sum(1 for _, _, is_correct in outcomes if is_correct),
+                        "created_at": now,
+                    }
+                    for outcomes in graded
+                ],
+            )
+        ).all()
+
+        answer_rows = [
+            {"attempt_id": attempt_id, "question_id": question_id, "answer": answer, "is_correct": is_correct}
+            for attempt_id, outcomes in zip(attempt_ids, graded)
+            for question_id, answer, is_correct in outcomes
+        ]
+        if answer_rows:
+            await db.execute(insert(QuizAttemptAnswer), answer_rows)
+
+        await self._add_to_stats(db, quiz_id, graded, now)
+        await db.commit()
+        return attempt_ids
+
+    async def _add_to_stats(
+        self, db: AsyncSession, quiz_id: int, graded: list[list[tuple[int, str, bool]]], now: datetime
+    ):
+        question_attempts = Counter()
+        question_correct = Counter()
+        answer_counts = Counter()
+        for outcomes in graded:
+            for question_id, answer, is_correct in outcomes:
+                question_attempts[question_id] += 1
+                question_correct[question_id] += is_correct
+                answer_counts[question_id, answer] += 1
+
+        await _increment(
+            db,
+            QuizStats,
+            [
+                {
+                    "quiz_id": quiz_id,
+                    "attempt_count": len(graded),
+                    "answer_count": sum(question_attempts.values()),
+                    "correct_count": sum(question_correct.values()),
+                    "updated_at": now,
+                }
+            ],
+            ["quiz_id"],
+            ["attempt_count", "answer_count", "correct_count"],
+        )
+        if not question_attempts:
+            return
+        await _increment(
+            db,
+            QuestionStats,
+            [
+                {
+                    "question_id": question_id,
+                    "quiz_id": quiz_id,
+                    "attempt_count": attempts,
+                    "correct_count": question_correct[question_id],
+                }
+                for question_id, attempts in question_attempts.items()
+            ],
+            ["question_id"],
+            ["attempt_count", "correct_count"],
+        )
+        await _increment(
+            db,
+            QuestionAnswerStats,
+            [
+                {"question_id": question_id, "answer": answer, "quiz_id": quiz_id, "count": count}
+                for (question_id, answer), count in answer_counts.items()
+            ],
+            ["question_id", "answer"],
+            ["count"],
+        )
+
+    async def get_quiz_stats(self, db: AsyncSession, quiz_id: int) -> dict:
+        """
+        Summary statistics of a quiz, read from the summary tables only.
+        Every current question is listed, including ones nobody has answered yet.
+        """
+        quiz_stats = await db.get(QuizStats, quiz_id)
+        questions = (
+            await db.execute(
+                select(
+                    Question.question_id,
+                    Question.question_text,
+                    QuestionStats.attempt_count,
+                    QuestionStats.correct_count,
+                )
+                .outerjoin(QuestionStats, QuestionStats.question_id == Question.question_id)
+                .where(Question.quiz_id == quiz_id)
+                .order_by(Question.question_id)
+            )
+        ).all()
+        answers = {}
+        for question_id, answer, count in await db.execute(
+            select(QuestionAnswerStats.question_id, QuestionAnswerStats.answer, QuestionAnswerStats.count)
+            .where(QuestionAnswerStats.quiz_id == quiz_id)
+        ):
+            answers.setdefault(question_id, {})[answer] = count
+
+        attempt_count = quiz_stats.attempt_count if quiz_stats else 0
+        return {
+            "quiz_id": quiz_id,
+            "attempt_count": attempt_count,
+            "average_correct": quiz_stats.correct_count / attempt_count if attempt_count else None,
+            "questions": [
+                {
+                    "question_id": question.question_id,
+                    "question_text": question.question_text,
+                    "attempt_count": question.attempt_count or 0,
+                    "correct_count": question.correct_count or 0,
+                    "correct_rate": (
+                        question.correct_count / question.attempt_count if question.attempt_count else None
+                    ),
+                    "answers": answers.get(question.question_id, {}),
+                }
+                for question in questions
+            ],
+        }
+
+
+async def _increment(db: AsyncSession, model, rows: list[dict], key: list[str], counters: list[str]):
+    """Insert `rows`, or add their `counters` to the existing rows with the same `key`."""
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(model)
+    updates = {column: getattr(model, column) + getattr(statement.excluded, column) for column in counters}
+    if "updated_at" in rows[0]:
+        updates["updated_at"] = statement.excluded.updated_at
+    await db.execute(statement.on_conflict_do_update(index_elements=key, set_=updates), rows)
@@ -0,0 +1,88 @@
+import os
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import Session, aliased
+
+from ..database.models import AudioAsset, AudioAssetBlock
+from ..utils.tts import block_path_for_hash
+
+
+class AudioAssetsRepository:
+    """
+    Reference-counted, content-addressed audio files shared between lessons.
+
+    None of these methods commit; they run inside the caller's transaction so the
+    reference count always changes together with the lesson that holds the reference.
+    """
+
+    def get_existing_path(self, db: Session, content_hash: str) -> Optional[str]:
+        """Path of the stored audio for `content_hash`, if its file is still on disk."""
+        asset = db.get(AudioAsset, content_hash)
+        if asset and os.path.exists(asset.file_path):
+            return asset.file_path
+        return None
+
+    def add_reference(
+        self, db: Session, content_hash: str, file_path: str, block_hashes: Iterable[str] = ()
+    ) -> int:
+        """
+        Add one reference and return the new count; a new asset also records the blocks its
+        audio was joined from. Raises IntegrityError if another transaction created the same
+        asset first, in which case the caller retries in a new transaction.
+        """
+        # Counted in SQL: the row stays locked until commit, so concurrent renders cannot lose an update
+        ref_count = db.scalar(
+            update(AudioAsset)
+            .where(AudioAsset.content_hash == content_hash)
+            .values(ref_count=AudioAsset.ref_count + 1, file_path=file_path)
+            .returning(AudioAsset.ref_count)
+        )
+        if ref_count is not None:
+            return ref_count
+        db.add(AudioAsset(content_hash=content_hash, file_path=file_path, ref_count=1))
+        db.add_all(
+            AudioAssetBlock(content_hash=content_hash, block_hash=block_hash)
+            for block_hash in set(block_hashes)
+        )
+        db.flush()
+        return 1
+
+    def remove_reference(self, db: Session, content_hash: Optional[str]) -> list[str]:
+        """
+        Drop one reference. Once nothing uses the asset anymore, returns its file and the
+        files of the blocks no other asset was joined from, for deletion.
+        The files should only be removed after the transaction commits.
+        """
+        if not content_hash:
+            return []
+        row = db.execute(
+            update(AudioAsset)
+            .where(AudioAsset.content_hash == content_hash)
+            .values(ref_count=AudioAsset.ref_count - 1)
+            .returning(AudioAsset.ref_count, AudioAsset.file_path)
+        ).first()
+        if row is None or row.ref_count > 0:
+            return []
+        # Correlated on block_hash, so each block is checked through its index
+        other = aliased(AudioAssetBlock)
+        shared = exists().where(
+            other.block_hash == AudioAssetBlock.block_hash, other.content_hash != content_hash
+        )
+        released_blocks = db.scalars(
+            select(AudioAssetBlock.block_hash)
+            .where(AudioAssetBlock.content_hash == content_hash)
+            .where(~shared)
+        ).all()
+        db.execute(delete(AudioAssetBlock).where(AudioAssetBlock.content_hash == content_hash))
+        db.execute(delete(AudioAsset).where(AudioAsset.content_hash == content_hash))
+        db.flush()
+        return [row.file_path, *(block_path_for_hash(block_hash) for block_hash in released_blocks)]
+
+    def get_tracked_blocks(self, db: Session, block_hashes: list[str]) -> set[str]:
+        """Those of `block_hashes` that some asset was joined from."""
+        return set(
+            db.scalars(
+                select(AudioAssetBlock.block_hash).where(AudioAssetBlock.block_hash.in_(block_hashes))
+            )
+        )
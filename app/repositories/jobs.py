@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database.models import GenerationJob
+
+
+class JobsRepository:
+    def get_job_by_id(self, db: Session, job_id: int) -> GenerationJob:
+        job = db.query(GenerationJob).filter(GenerationJob.job_id == job_id).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def create_job(
+        self, db: Session, user_id: int, learning_field: str, description: str
+    ) -> GenerationJob:
+        try:
+            job = GenerationJob(
+                user_id=user_id,
+                learning_field=learning_field,
+                description=description,
+                status="queued",
+                attempts=0,
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return job
+        except IntegrityError as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Integrity error while creating job: {str(e)}",
+            )
+
+    def requeue_interrupted_jobs(self, db: Session, lease_seconds: float, max_attempts: int) -> tuple[int, int]:
+        """
+        Put `running` jobs whose lease expired (their process stopped) back into the queue,
+        or fail them once they have been started `max_attempts` times, so a job that kills
+        its process is not retried forever. Jobs of live workers keep renewing their lease
+        and are left alone. Returns the number of requeued and failed jobs.
+        """
+        now = datetime.utcnow()
+        expired = (
+            GenerationJob.status == "running",
+            GenerationJob.updated_at < now - timedelta(seconds=lease_seconds),
+        )
+        failed = (
+            db.query(GenerationJob)
+            .filter(*expired, GenerationJob.attempts >= max_attempts)
+            .update(
+                {
+                    GenerationJob.status: "failed",
+                    GenerationJob.error: f"Interrupted {max_attempts} times; giving up",
+                    GenerationJob.updated_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        requeued = (
+            db.query(GenerationJob)
+            .filter(*expired)
+            .update(
+                {
+                    GenerationJob.status: "queued",
+                    GenerationJob.worker_id: None,
+                    GenerationJob.updated_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return requeued, failed
+
+    def get_queued_job_ids(self, db: Session) -> list[int]:
+        rows = (
+            db.query(GenerationJob.job_id)
+            .filter(GenerationJob.status == "queued")
+            .order_by(GenerationJob.job_id)
+            .all()
+        )
+        return [row.job_id for row in rows]
+
+    def claim_job(self, db: Session, job_id: int, worker_id: str) -> Optional[GenerationJob]:
+        """
+        Move a queued job to `running` under `worker_id`'s lease and return it,
+        or None if another worker already picked it up.
+        """
+        claimed = (
+            db.query(GenerationJob)
+            .filter(
+                GenerationJob.job_id == job_id,
+                GenerationJob.status == "queued",
+            )
+            .update(
+                {
+                    GenerationJob.status: "running",
+                    GenerationJob.worker_id: worker_id,
+                    GenerationJob.attempts: GenerationJob.attempts + 1,
+                    GenerationJob.updated_at: datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if not claimed:
+            return None
+        return self.get_job_by_id(db, job_id)
+
+    def renew_lease(self, db: Session, job_id: int, worker_id: str) -> bool:
+        """Extend the lease of a running job; False if `worker_id` no longer holds it."""
+        renewed = (
+            db.query(GenerationJob)
+            .filter(
+                GenerationJob.job_id == job_id,
+                GenerationJob.status == "running",
+                GenerationJob.worker_id == worker_id,
+            )
+            .update({GenerationJob.updated_at: datetime.utcnow()}, synchronize_session=False)
+        )
+        db.commit()
+        return bool(renewed)
+
+    def mark_succeeded(self, db: Session, job_id: int, worker_id: str, lesson_id: int):
+        self._finish(db, job_id, worker_id, "succeeded", lesson_id=lesson_id, error=None)
+
+    def mark_failed(self, db: Session, job_id: int, worker_id: str, error: str):
+        self._finish(db, job_id, worker_id, "failed", error=error)
+
+    def _finish(self, db: Session, job_id: int, worker_id: str, status: str, **fields):
+        # A worker that lost its lease does not overwrite the outcome of the one that took over
+        db.query(GenerationJob).filter(
+            GenerationJob.job_id == job_id,
+            GenerationJob.status == "running",
+            GenerationJob.worker_id == worker_id,
+        ).update(
+            {
+                GenerationJob.status: status,
+                GenerationJob.updated_at: datetime.utcnow(),
+                **{getattr(GenerationJob, key): value for key, value in fields.items()},
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+class AsyncJobsRepository:
+    """
+    The parts of JobsRepository used by request handlers running on the event loop.
+    Workers claim and finish jobs through the synchronous JobsRepository.
+    """
+
+    async def get_job_by_id(self, db: AsyncSession, job_id: int) -> GenerationJob:
+        job = await db.get(GenerationJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    async def create_job(
+        self, db: AsyncSession, user_id: int, learning_field: str, description: str
+    ) -> GenerationJob:
+        try:
+            job = GenerationJob(
+                user_id=user_id,
+                learning_field=learning_field,
+                description=description,
+                status="queued",
+                attempts=0,
+            )
+            db.add(job)
+            await db.commit()
+            return job
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Integrity error while creating job: {str(e)}",
+            )
@@ -1,12 +1,34 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Text, cast, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from ..database.models import Lesson
-from ..schemas.lessons import LessonCreate, LessonUpdate
-from typing import Optional
-import asyncio
-import uuid
-from ..utils.tts import extract_text_from_content, generate_and_save_audio
+from ..config import LESSON_TRANSFER_BATCH_SIZE
+from ..database.models import Lesson, Question, Quiz
+from ..schemas.lessons import LessonCreate, LessonTreeCreate, LessonUpdate
+from typing import AsyncIterable, AsyncIterator, Optional
+from ..utils.answer_keys import answer_keys
+from ..utils.audio_pipeline import audio_locations, audio_workers, needs_audio
+from ..utils.tts import delete_audio_file
+from ..utils.response_cache import lesson_scope, quiz_scope, response_cache, user_scope
+from .audio import AudioAssetsRepository
+from .questions import _question_rows
+from .quizzes import AsyncQuizzesRepository, QuizzesRepository
+
+quizzes_repository = QuizzesRepository()
+async_quizzes_repository = AsyncQuizzesRepository()
+audio_assets_repository = AudioAssetsRepository()
+
+# The columns of a LessonResponse, with `content` as its stored JSON text rather than parsed
+LESSON_PAYLOAD_COLUMNS = (
+    Lesson.lesson_id,
+    Lesson.user_id,
+    Lesson.title,
+    Lesson.description,
+    Lesson.position,
+    cast(Lesson.content, Text).label("content_json"),
+    Lesson.audio_status,
+)
 
 
 class LessonsRepository:
@@ -22,6 +44,13 @@ class LessonsRepository:
             raise HTTPException(status_code=404, detail="No lessons found for the user")
         return lessons
 
+    def get_last_position(self, db: Session, user_id: int) -> int:
+        """Highest lesson position used by the user, or 0 if none is set."""
+        last = (
+            db.query(func.max(Lesson.position)).filter(Lesson.user_id == user_id).scalar()
+        )
+        return last or 0
+
     # def create_lesson(
     #     self, db: Session, user_id: int, lesson_data: LessonCreate
     # ) -> Lesson:
@@ -52,26 +81,18 @@ class LessonsRepository:
                 user_id=user_id,
                 title=lesson_data.title,
                 description=lesson_data.description,
+                position=lesson_data.position,
                 content=lesson_data.content,
+                audio_status="pending" if needs_audio(lesson_data.content) else None,
             )
             db.add(new_lesson)
+            db.flush()
+            response_cache.bump(db, user_scope(user_id), lesson_scope(new_lesson.lesson_id))
             db.commit()
             db.refresh(new_lesson)
 
-            # Generate audio if content exists
-            if new_lesson.content:
-                text = extract_text_from_content(new_lesson.content)
-                if text:
-                    filename = (
-                        f"lesson_{new_lesson.lesson_id}_{uuid.uuid4().hex[:8]}.mp3"
-                    )
-                    # Call the audio generator (using asyncio to run it asynchronously)
-                    audio_path = asyncio.run(
-                        generate_and_save_audio(text, "en-US-GuyNeural", filename)
-                    )
-                    new_lesson.audio_file_path = str(audio_path)
-                    db.commit()
-                    db.refresh(new_lesson)
+            # Audio is rendered in the background; the lesson is returned right away
+            _schedule_audio(new_lesson)
 
             return new_lesson
         except IntegrityError as e:
@@ -87,32 +108,421 @@ class LessonsRepository:
                 detail=f"Unexpected error while creating lesson: {str(e)}",
             )
 
-    def update_lesson(
-        self, db: Session, lesson_id: int, lesson_data: LessonUpdate
+    def create_lesson_tree(
+        self, db: Session, user_id: int, lesson_data: LessonTreeCreate
     ) -> Lesson:
-        lesson = self.get_lesson_by_id(db, lesson_id)
+        """
+        Create a lesson with its quiz and questions in one transaction.
+        Questions are inserted with a single executemany and nothing is refreshed row by row.
+        """
         try:
-            for field, value in lesson_data.dict(exclude_unset=True).items():
-                setattr(lesson, field, value)
+            new_lesson = Lesson(
+                user_id=user_id,
+                title=lesson_data.title,
+                description=lesson_data.description,
+                position=lesson_data.position,
+                content=lesson_data.content,
+                audio_status="pending" if needs_audio(lesson_data.content) else None,
+            )
+            db.add(new_lesson)
+            db.flush()
+            scopes = [user_scope(user_id), lesson_scope(new_lesson.lesson_id)]
+            if lesson_data.quiz:
+                new_quiz = quizzes_repository.add_quiz_tree(db, new_lesson.lesson_id, lesson_data.quiz)
+                scopes.append(quiz_scope(new_quiz.quiz_id))
+            response_cache.bump(db, *scopes)
             db.commit()
-            db.refresh(lesson)
-            return lesson
+        except HTTPException:
+            db.rollback()
+            raise
         except IntegrityError as e:
             db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Integrity error while creating lesson: {str(e)}",
+            )
+
+        _schedule_audio(new_lesson)
+        return new_lesson
+
+
+class AsyncLessonsRepository:
+    """
+    LessonsRepository for request handlers running on the event loop.
+    """
+
+    async def get_lesson_by_id(self, db: AsyncSession, lesson_id: int) -> Lesson:
+        lesson = await db.scalar(select(Lesson).where(Lesson.lesson_id == lesson_id))
+        if not lesson:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        return lesson
+
+    async def get_lesson_tree(self, db: AsyncSession, lesson_id: int) -> Lesson:
+        """
+        Load a lesson with its quiz and questions in two statements, however many questions there are:
+        the quiz is joined to the lesson and the questions are fetched with one `IN` query.
+        """
+        lesson = (
+            await db.scalars(
+                select(Lesson)
+                .where(Lesson.lesson_id == lesson_id)
+                .options(joinedload(Lesson.quiz).selectinload(Quiz.questions))
+            )
+        ).unique().first()
+        if not lesson:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        return lesson
+
+    async def get_user_lessons(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        cursor: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[Lesson]:
+        """
+        The user's lessons by `lesson_id`. With `limit`, returns one page of lessons
+        after the `cursor` lesson ID (keyset pagination).
+        """
+        query = _user_lessons_page(select(Lesson), user_id, cursor, limit)
+        lessons = (await db.scalars(query)).all()
+        if not lessons and cursor is None:
+            raise HTTPException(status_code=404, detail="No lessons found for the user")
+        return lessons
+
+    async def get_lesson_payload_row(self, db: AsyncSession, lesson_id: int):
+        """A lesson as a row of `LESSON_PAYLOAD_COLUMNS`, for serializing without loading the model."""
+        row = (await db.execute(select(*LESSON_PAYLOAD_COLUMNS).where(Lesson.lesson_id == lesson_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        return row
+
+    async def get_user_lesson_payload_rows(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        cursor: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list:
+        """`get_user_lessons` as rows of `LESSON_PAYLOAD_COLUMNS`."""
+        query = _user_lessons_page(select(*LESSON_PAYLOAD_COLUMNS), user_id, cursor, limit)
+        rows = (await db.execute(query)).all()
+        if not rows and cursor is None:
+            raise HTTPException(status_code=404, detail="No lessons found for the user")
+        return rows
+
+    async def get_user_lesson_summaries(
+        self, db: AsyncSession, user_id: int, cursor: Optional[int], limit: int
+    ) -> tuple[list, Optional[int]]:
+        """
+        One page of the user's lessons with only the listing columns; `content` is never loaded.
+        Returns the rows and the cursor of the next page (None on the last page).
+        """
+        query = _user_lessons_page(
+            select(Lesson.lesson_id, Lesson.title, Lesson.description, Lesson.position),
+            user_id,
+            cursor,
+            limit + 1,
+        )
+        rows = (await db.execute(query)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, rows[-1].lesson_id
+        return rows, None
+
+    async def get_last_position(self, db: AsyncSession, user_id: int) -> int:
+        """Highest lesson position used by the user, or 0 if none is set."""
+        last = await db.scalar(
+            select(func.max(Lesson.position)).where(Lesson.user_id == user_id)
+        )
+        return last or 0
+
+    async def create_lesson(
+        self, db: AsyncSession, user_id: int, lesson_data: LessonCreate
+    ) -> Lesson:
+        try:
+            new_lesson = Lesson(
+                user_id=user_id,
+                title=lesson_data.title,
+                description=lesson_data.description,
+                position=lesson_data.position,
+                content=lesson_data.content,
+                audio_status="pending" if needs_audio(lesson_data.content) else None,
+            )
+            db.add(new_lesson)
+            await db.flush()
+            await response_cache.bump_async(db, user_scope(user_id), lesson_scope(new_lesson.lesson_id))
+            await db.commit()
+
+            # Audio is rendered in the background; the lesson is returned right away
+            _schedule_audio(new_lesson)
+            return new_lesson
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Integrity error while creating lesson: {str(e)}",
+            )
+
+    async def create_lesson_tree(
+        self, db: AsyncSession, user_id: int, lesson_data: LessonTreeCreate
+    ) -> Lesson:
+        """
+        Create a lesson with its quiz and questions in one transaction.
+        Questions are inserted with a single executemany and nothing is refreshed row by row.
+        """
+        try:
+            new_lesson = Lesson(
+                user_id=user_id,
+                title=lesson_data.title,
+                description=lesson_data.description,
+                position=lesson_data.position,
+                content=lesson_data.content,
+                audio_status="pending" if needs_audio(lesson_data.content) else None,
+            )
+            db.add(new_lesson)
+            await db.flush()
+            scopes = [user_scope(user_id), lesson_scope(new_lesson.lesson_id)]
+            if lesson_data.quiz:
+                new_quiz = await async_quizzes_repository.add_quiz_tree(
+                    db, new_lesson.lesson_id, lesson_data.quiz
+                )
+                scopes.append(quiz_scope(new_quiz.quiz_id))
+            await response_cache.bump_async(db, *scopes)
+            await db.commit()
+        except HTTPException:
+            await db.rollback()
+            raise
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Integrity error while creating lesson: {str(e)}",
+            )
+
+        _schedule_audio(new_lesson)
+        return new_lesson
+
+    async def retry_lesson_audio(self, db: AsyncSession, lesson_id: int) -> Lesson:
+        """
+        Queue a new render for a lesson whose audio failed.
+        """
+        lesson = await self.get_lesson_by_id(db, lesson_id)
+        if lesson.audio_status != "failed":
+            raise HTTPException(
+                status_code=400, detail="Only failed audio renders can be retried"
+            )
+        lesson.audio_status = "pending"
+        await response_cache.bump_async(db, user_scope(lesson.user_id))
+        await db.commit()
+        _schedule_audio(lesson)
+        return lesson
+
+    async def update_lesson(
+        self, db: AsyncSession, lesson_id: int, lesson_data: LessonUpdate
+    ) -> Lesson:
+        lesson = await self.get_lesson_by_id(db, lesson_id)
+        try:
+            updates = lesson_data.dict(exclude_unset=True)
+            content_changed = "content" in updates and updates["content"] != lesson.content
+            for field, value in updates.items():
+                setattr(lesson, field, value)
+            if content_changed and (lesson.audio_hash or needs_audio(lesson.content)):
+                # Re-render in the background; unchanged blocks come from the block cache
+                lesson.audio_status = "pending"
+            await response_cache.bump_async(db, user_scope(lesson.user_id))
+            await db.commit()
+            _schedule_audio(lesson)
+            return lesson
+        except IntegrityError as e:
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Integrity error while updating lesson: {str(e)}",
             )
 
-    def delete_lesson(self, db: Session, lesson_id: int):
-        lesson = self.get_lesson_by_id(db, lesson_id)
+    async def delete_lesson(self, db: AsyncSession, lesson_id: int):
+        lesson = await self.get_lesson_by_id(db, lesson_id)
         try:
-            db.delete(lesson)
-            db.commit()
+            # Audio shared with other lessons stays; only unused files are removed
+            released = await db.run_sync(
+                audio_assets_repository.remove_reference, lesson.audio_hash
+            )
+            scopes = _deleted_lesson_scopes(
+                lesson, (await db.execute(select(Quiz.quiz_id).where(Quiz.lesson_id == lesson_id))).all()
+            )
+            await db.delete(lesson)
+            await response_cache.bump_async(db, *scopes)
+            await db.commit()
+            audio_locations.invalidate(lesson_id)
+            for path in released:
+                delete_audio_file(path)
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Integrity error while deleting lesson: {str(e)}",
             )
 
+    async def iter_lesson_trees(
+        self, db: AsyncSession, user_id: int, batch_size: int = LESSON_TRANSFER_BATCH_SIZE
+    ) -> AsyncIterator[list[tuple]]:
+        """
+        The user's lessons by `lesson_id`, `batch_size` at a time, as (lesson, quiz or None,
+        questions) with lessons as rows of `LESSON_PAYLOAD_COLUMNS`. Lessons are read through
+        a server-side cursor, and each batch costs one query for its quizzes and one for their
+        questions, so memory is bounded by the batch rather than by the user's lessons.
+        """
+        result = await db.stream(
+            _user_lessons_page(select(*LESSON_PAYLOAD_COLUMNS), user_id, None, None)
+            .execution_options(yield_per=batch_size)
+        )
+        async for lessons in result.partitions():
+            quizzes = {}
+            for quiz in await db.execute(
+                select(Quiz.quiz_id, Quiz.lesson_id, Quiz.title, Quiz.description)
+                .where(Quiz.lesson_id.in_([lesson.lesson_id for lesson in lessons]))
+                .order_by(Quiz.quiz_id)
+            ):
+                # A lesson has at most one quiz; like LessonFullResponse, the first one wins
+                quizzes.setdefault(quiz.lesson_id, quiz)
+
+            questions = {}
+            if quizzes:
+                for question in await db.execute(
+                    select(
+                        Question.quiz_id,
+                        Question.question_text,
+                        Question.question_type,
+                        Question.options,
+                        Question.correct_answer,
+                    )
+                    .where(Question.quiz_id.in_([quiz.quiz_id for quiz in quizzes.values()]))
+                    .order_by(Question.question_id)
+                ):
+                    questions.setdefault(question.quiz_id, []).append(question)
+
+            trees = []
+            for lesson in lessons:
+                quiz = quizzes.get(lesson.lesson_id)
+                trees.append((lesson, quiz, questions.get(quiz.quiz_id, []) if quiz else []))
+            yield trees
+
+    async def import_lesson_trees(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        lessons: AsyncIterable[LessonTreeCreate],
+        batch_size: int = LESSON_TRANSFER_BATCH_SIZE,
+    ) -> dict:
+        """
+        Create lessons with their quizzes and questions as they arrive from `lessons`,
+        committing every `batch_size` lessons. If the stream fails part way, the batches
+        committed before the failure stay imported and the error says how many lessons that is.
+        Returns how many lessons, quizzes and questions were created.
+        """
+        counts = {"lessons": 0, "quizzes": 0, "questions": 0}
+        batch = []
+        try:
+            async for lesson_data in lessons:
+                batch.append(lesson_data)
+                if len(batch) >= batch_size:
+                    await self._insert_lesson_trees(db, user_id, batch, counts)
+                    batch = []
+            if batch:
+                await self._insert_lesson_trees(db, user_id, batch, counts)
+        except HTTPException as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=f"{e.detail}; the first {counts['lessons']} lessons were imported",
+            )
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Integrity error while importing lessons: {str(e)}; the first {counts['lessons']} lessons were imported",
+            )
+        return counts
+
+    async def _insert_lesson_trees(
+        self, db: AsyncSession, user_id: int, batch: list[LessonTreeCreate], counts: dict
+    ):
+        """One transaction of three INSERTs (lessons, quizzes, questions) for the whole batch."""
+        # IDs come back in the order of `batch`; render_nulls keeps rows with None
+        # values in the same statement as the others
+        lesson_ids = (
+            await db.scalars(
+                insert(Lesson)
+                .returning(Lesson.lesson_id, sort_by_parameter_order=True)
+                .execution_options(render_nulls=True),
+                [
+                    {
+                        "user_id": user_id,
+                        "title": lesson_data.title,
+                        "description": lesson_data.description,
+                        "position": lesson_data.position,
+                        "content": lesson_data.content,
+                        "audio_status": "pending" if needs_audio(lesson_data.content) else None,
+                    }
+                    for lesson_data in batch
+                ],
+            )
+        ).all()
+        with_quiz = [
+            (lesson_id, lesson_data.quiz) for lesson_id, lesson_data in zip(lesson_ids, batch) if lesson_data.quiz
+        ]
+        quiz_ids = []
+        question_rows = []
+        if with_quiz:
+            quiz_ids = (
+                await db.scalars(
+                    insert(Quiz)
+                    .returning(Quiz.quiz_id, sort_by_parameter_order=True)
+                    .execution_options(render_nulls=True),
+                    [
+                        {"lesson_id": lesson_id, "title": quiz_data.title, "description": quiz_data.description}
+                        for lesson_id, quiz_data in with_quiz
+                    ],
+                )
+            ).all()
+            for quiz_id, (_, quiz_data) in zip(quiz_ids, with_quiz):
+                question_rows.extend(_question_rows(quiz_id, quiz_data.questions))
+            if question_rows:
+                await db.execute(insert(Question).execution_options(render_nulls=True), question_rows)
+        await response_cache.bump_async(db, user_scope(user_id))
+        await db.commit()
+
+        # Like add_quiz_tree: a key loading for a reused quiz ID must not be cached
+        for quiz_id in quiz_ids:
+            answer_keys.invalidate(quiz_id)
+        for lesson_id, lesson_data in zip(lesson_ids, batch):
+            if needs_audio(lesson_data.content):
+                audio_workers.submit(lesson_id)
+
+        counts["lessons"] += len(lesson_ids)
+        counts["quizzes"] += len(quiz_ids)
+        counts["questions"] += len(question_rows)
+
+
+def _user_lessons_page(query, user_id: int, cursor: Optional[int], limit: Optional[int]):
+    query = query.where(Lesson.user_id == user_id).order_by(Lesson.lesson_id)
+    if cursor is not None:
+        query = query.where(Lesson.lesson_id > cursor)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _deleted_lesson_scopes(lesson: Lesson, quiz_rows) -> list[str]:
+    # The lesson's quizzes and questions go with it, so their cached responses must too
+    return [
+        user_scope(lesson.user_id),
+        lesson_scope(lesson.lesson_id),
+        *(quiz_scope(row.quiz_id) for row in quiz_rows),
+    ]
+
+
+def _schedule_audio(lesson: Lesson):
+    if lesson.audio_status == "pending":
+        audio_workers.submit(lesson.lesson_id)
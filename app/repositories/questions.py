@@ -1,8 +1,12 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from ..database.models import Question
 from ..schemas.questions import QuestionCreate, QuestionUpdate
+from ..utils.answer_keys import AnswerKey, answer_keys
+from ..utils.response_cache import quiz_scope, response_cache
 
 VALID_TYPES = ["multiple_choice", "true_false"]
 
@@ -24,8 +28,67 @@ class QuestionsRepository:
             )
         return questions
 
-    def create_question(
-        self, db: Session, quiz_id: int, question_data: QuestionCreate
+    def add_questions(
+        self, db: Session, quiz_id: int, questions: list[QuestionCreate]
+    ):
+        """
+        Insert all questions of a quiz with a single executemany.
+        Does not commit; the caller owns the transaction.
+        """
+        rows = _question_rows(quiz_id, questions)
+        if rows:
+            db.execute(insert(Question), rows)
+            answer_keys.invalidate(quiz_id)
+
+
+class AsyncQuestionsRepository:
+    """
+    QuestionsRepository for request handlers running on the event loop.
+    """
+
+    async def get_question_by_id(self, db: AsyncSession, question_id: int) -> Question:
+        question = await db.scalar(
+            select(Question).where(Question.question_id == question_id)
+        )
+        if not question:
+            raise HTTPException(status_code=404, detail="Question not found")
+        return question
+
+    async def get_quiz_questions(self, db: AsyncSession, quiz_id: int) -> list[Question]:
+        questions = (
+            await db.scalars(select(Question).where(Question.quiz_id == quiz_id))
+        ).all()
+        if not questions:
+            raise HTTPException(
+                status_code=404, detail="No questions found for the specified quiz"
+            )
+        return questions
+
+    async def get_answer_key(self, db: AsyncSession, quiz_id: int) -> AnswerKey:
+        """
+        The quiz's answer key from the cache, or built from the questions' answer
+        columns alone (no ORM objects) and cached.
+        """
+        answer_key = answer_keys.get(quiz_id)
+        if answer_key is not None:
+            return answer_key
+        generation = answer_keys.generation()
+        rows = (
+            await db.execute(
+                select(Question.question_id, Question.question_type, Question.correct_answer)
+                .where(Question.quiz_id == quiz_id)
+            )
+        ).all()
+        if not rows:
+            raise HTTPException(
+                status_code=404, detail="No questions found for the specified quiz"
+            )
+        answer_key = AnswerKey(rows)
+        answer_keys.set(quiz_id, answer_key, generation)
+        return answer_key
+
+    async def create_question(
+        self, db: AsyncSession, quiz_id: int, question_data: QuestionCreate
     ) -> Question:
         try:
             if question_data.question_type not in VALID_TYPES:
@@ -42,20 +105,33 @@ class QuestionsRepository:
                 correct_answer=question_data.correct_answer,
             )
             db.add(new_question)
-            db.commit()
-            db.refresh(new_question)
+            await response_cache.bump_async(db, quiz_scope(quiz_id))
+            await db.commit()
+            answer_keys.invalidate(quiz_id)
             return new_question
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Integrity error while creating question: {str(e)}",
             )
 
-    def update_question(
-        self, db: Session, question_id: int, question_data: QuestionUpdate
+    async def add_questions(
+        self, db: AsyncSession, quiz_id: int, questions: list[QuestionCreate]
+    ):
+        """
+        Insert all questions of a quiz with a single executemany.
+        Does not commit; the caller owns the transaction.
+        """
+        rows = _question_rows(quiz_id, questions)
+        if rows:
+            await db.execute(insert(Question), rows)
+            answer_keys.invalidate(quiz_id)
+
+    async def update_question(
+        self, db: AsyncSession, question: Question, question_data: QuestionUpdate
     ) -> Question:
-        question = self.get_question_by_id(db, question_id)
+        """Update a question the caller has already loaded."""
         try:
             if (
                 question_data.question_type
@@ -67,24 +143,48 @@ class QuestionsRepository:
                 )
             for field, value in question_data.dict(exclude_unset=True).items():
                 setattr(question, field, value)
-            db.commit()
-            db.refresh(question)
+            await response_cache.bump_async(db, quiz_scope(question.quiz_id))
+            await db.commit()
+            answer_keys.invalidate(question.quiz_id)
             return question
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Integrity error while updating question: {str(e)}",
             )
 
-    def delete_question(self, db: Session, question_id: int):
-        question = self.get_question_by_id(db, question_id)
+    async def delete_question(self, db: AsyncSession, question: Question):
+        """Delete a question the caller has already loaded."""
         try:
-            db.delete(question)
-            db.commit()
+            quiz_id = question.quiz_id
+            await db.delete(question)
+            await response_cache.bump_async(db, quiz_scope(quiz_id))
+            await db.commit()
+            answer_keys.invalidate(quiz_id)
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Integrity error while deleting question: {str(e)}",
             )
+
+
+
+def _question_rows(quiz_id: int, questions: list[QuestionCreate]) -> list[dict]:
+    invalid = [q.question_type for q in questions if q.question_type not in VALID_TYPES]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid question type. Must be one of: {', '.join(VALID_TYPES)}",
+        )
+    return [
+        {
+            "quiz_id": quiz_id,
+            "question_text": question.question_text,
+            "question_type": question.question_type,
+            "options": question.options,
+            "correct_answer": question.correct_answer,
+        }
+        for question in questions
+    ]
@@ -1,8 +1,16 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from ..database.models import Quiz
-from ..schemas.quizzes import QuizCreate, QuizUpdate
+from ..schemas.quizzes import QuizCreate, QuizTreeCreate, QuizUpdate
+from ..utils.answer_keys import answer_keys
+from ..utils.response_cache import lesson_scope, quiz_scope, response_cache
+from .questions import AsyncQuestionsRepository, QuestionsRepository
+
+questions_repository = QuestionsRepository()
+async_questions_repository = AsyncQuestionsRepository()
 
 
 class QuizzesRepository:
@@ -20,10 +28,74 @@ class QuizzesRepository:
             )
         return quiz
 
-    def create_quiz(self, db: Session, lesson_id: int, quiz_data: QuizCreate) -> Quiz:
+    def add_quiz_tree(self, db: Session, lesson_id: int, quiz_data: QuizTreeCreate) -> Quiz:
+        """
+        Add a quiz and its questions to the current transaction without committing.
+        """
+        new_quiz = Quiz(
+            lesson_id=lesson_id,
+            title=quiz_data.title,
+            description=quiz_data.description,
+        )
+        db.add(new_quiz)
+        db.flush()
+        answer_keys.invalidate(new_quiz.quiz_id)
+        questions_repository.add_questions(db, new_quiz.quiz_id, quiz_data.questions)
+        return new_quiz
+
+    def create_quiz_tree(
+        self, db: Session, lesson_id: int, quiz_data: QuizTreeCreate
+    ) -> Quiz:
+        """
+        Create a quiz and all of its questions in a single transaction.
+        """
+        try:
+            existing_quiz = db.query(Quiz.quiz_id).filter(Quiz.lesson_id == lesson_id).first()
+            if existing_quiz:
+                raise HTTPException(
+                    status_code=400,
+                    detail="A quiz already exists for this lesson",
+                )
+
+            new_quiz = self.add_quiz_tree(db, lesson_id, quiz_data)
+            response_cache.bump(db, lesson_scope(lesson_id), quiz_scope(new_quiz.quiz_id))
+            db.commit()
+            return new_quiz
+        except HTTPException:
+            db.rollback()
+            raise
+        except IntegrityError as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=400, detail=f"Integrity error while creating quiz: {str(e)}"
+            )
+
+
+class AsyncQuizzesRepository:
+    """
+    QuizzesRepository for request handlers running on the event loop.
+    """
+
+    async def get_quiz_by_id(self, db: AsyncSession, quiz_id: int) -> Quiz:
+        quiz = await db.scalar(select(Quiz).where(Quiz.quiz_id == quiz_id))
+        if not quiz:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        return quiz
+
+    async def get_lesson_quiz(self, db: AsyncSession, lesson_id: int) -> Quiz:
+        quiz = await db.scalar(select(Quiz).where(Quiz.lesson_id == lesson_id).limit(1))
+        if not quiz:
+            raise HTTPException(
+                status_code=404, detail="No quiz found for the specified lesson"
+            )
+        return quiz
+
+    async def create_quiz(self, db: AsyncSession, lesson_id: int, quiz_data: QuizCreate) -> Quiz:
         try:
             # Ensure no duplicate quiz for the lesson
-            existing_quiz = db.query(Quiz).filter(Quiz.lesson_id == lesson_id).first()
+            existing_quiz = await db.scalar(
+                select(Quiz.quiz_id).where(Quiz.lesson_id == lesson_id).limit(1)
+            )
             if existing_quiz:
                 raise HTTPException(
                     status_code=400,
@@ -36,36 +108,57 @@ class QuizzesRepository:
                 description=quiz_data.description,
             )
             db.add(new_quiz)
-            db.commit()
-            db.refresh(new_quiz)
+            await db.flush()
+            await response_cache.bump_async(db, lesson_scope(lesson_id), quiz_scope(new_quiz.quiz_id))
+            await db.commit()
+            # Quiz IDs can be reused after a delete; drop any key left from the old quiz
+            answer_keys.invalidate(new_quiz.quiz_id)
             return new_quiz
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400, detail=f"Integrity error while creating quiz: {str(e)}"
             )
 
-    def update_quiz(self, db: Session, quiz_id: int, quiz_data: QuizUpdate) -> Quiz:
-        quiz = self.get_quiz_by_id(db, quiz_id)
+    async def add_quiz_tree(self, db: AsyncSession, lesson_id: int, quiz_data: QuizTreeCreate) -> Quiz:
+        """
+        Add a quiz and its questions to the current transaction without committing.
+        """
+        new_quiz = Quiz(
+            lesson_id=lesson_id,
+            title=quiz_data.title,
+            description=quiz_data.description,
+        )
+        db.add(new_quiz)
+        await db.flush()
+        answer_keys.invalidate(new_quiz.quiz_id)
+        await async_questions_repository.add_questions(db, new_quiz.quiz_id, quiz_data.questions)
+        return new_quiz
+
+    async def update_quiz(self, db: AsyncSession, quiz: Quiz, quiz_data: QuizUpdate) -> Quiz:
+        """Update a quiz the caller has already loaded."""
         try:
             for field, value in quiz_data.dict(exclude_unset=True).items():
                 setattr(quiz, field, value)
-            db.commit()
-            db.refresh(quiz)
+            await response_cache.bump_async(db, quiz_scope(quiz.quiz_id), lesson_scope(quiz.lesson_id))
+            await db.commit()
             return quiz
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400, detail=f"Integrity error while updating quiz: {str(e)}"
             )
 
-    def delete_quiz(self, db: Session, quiz_id: int):
-        quiz = self.get_quiz_by_id(db, quiz_id)
+    async def delete_quiz(self, db: AsyncSession, quiz: Quiz):
+        """Delete a quiz the caller has already loaded."""
         try:
-            db.delete(quiz)
-            db.commit()
+            quiz_id, lesson_id = quiz.quiz_id, quiz.lesson_id
+            await db.delete(quiz)
+            await response_cache.bump_async(db, quiz_scope(quiz_id), lesson_scope(lesson_id))
+            await db.commit()
+            answer_keys.invalidate(quiz_id)
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=400, detail=f"Integrity error while deleting quiz: {str(e)}"
             )
@@ -1,21 +1,45 @@
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 
 from fastapi import HTTPException, status
+from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..database.models import User, VerificationCode
 from ..schemas.users import UserCreate, UserUpdate
 from ..schemas.verification_code import VerificationCodeCreate
+from ..utils.auth_cache import user_profiles
+from ..utils.response_cache import response_cache, user_scope
 from ..utils.code_generator import generate_verification_code
 
 
 class UsersRepository:
-    def create_user(self, db: Session, user_data: UserCreate) -> User:
+    def get_user_by_email(self, db: Session, email: str) -> User:
+        """Retrieve a user by their email."""
+        user = db.query(User).filter(User.email == email).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+    
+    def get_user_by_id(self, db: Session, user_id: int) -> User:
+        """Retrieve a user by their ID."""
+        user = db.query(User).filter(User.user_id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+
+
+class AsyncUsersRepository:
+    """
+    UsersRepository for request handlers running on the event loop.
+    """
+
+    async def create_user(self, db: AsyncSession, user_data: UserCreate) -> User:
         """Create a new user."""
         try:
-            existing_user = db.query(User).filter(User.email == user_data.email).first()
+            existing_user = await db.scalar(select(User).where(User.email == user_data.email))
             if existing_user:
                 raise HTTPException(status_code=400, detail="User with this email already exists")
 
@@ -26,63 +50,67 @@ class UsersRepository:
             )
 
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
             return new_user
 
         except IntegrityError:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=400, detail="Integrity error occurred while creating the user.")
 
-    def get_user_by_email(self, db: Session, email: str) -> User:
+    async def get_user_by_email(self, db: AsyncSession, email: str) -> User:
         """Retrieve a user by their email."""
-        user = db.query(User).filter(User.email == email).first()
+        user = await db.scalar(select(User).where(User.email == email))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
-    
-    def get_user_by_email_reg(self, db: Session, email: str) -> User:
+
+    async def get_user_by_email_reg(self, db: AsyncSession, email: str) -> Optional[User]:
         """Get user by email (for registration purposes)"""
-        user = db.query(User).filter(User.email == email).first()
+        return await db.scalar(select(User).where(User.email == email))
 
-    def get_user_by_id(self, db: Session, user_id: int) -> User:
+    async def get_user_by_id(self, db: AsyncSession, user_id: int) -> User:
         """Retrieve a user by their ID."""
-        user = db.query(User).filter(User.user_id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
-    def update_user(self, db: Session, user_id: int, user_data: UserUpdate):
+    async def update_user(self, db: AsyncSession, user_id: int, user_data: UserUpdate):
         """Update a user."""
-        user = db.query(User).filter(User.user_id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        user = await self.get_user_by_id(db, user_id)
 
         # Dynamically update fields
         for field, value in user_data.dict(exclude_unset=True).items():
             setattr(user, field, value)
 
         try:
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            user_profiles.invalidate(user_id)
             return user
 
         except IntegrityError:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=400, detail="Integrity error occurred while updating the user.")
 
-    def delete_user(self, db: Session, user_id: int):
-        """Delete a user by their ID."""
-        user = db.query(User).filter(User.user_id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        db.delete(user)
-        db.commit()
+    async def update_password(self, db: AsyncSession, user: User, password_hashed: str):
+        """Replace a user's password hash."""
+        user.password_hashed = password_hashed
+        await db.commit()
 
-    def create_verification_code(self, db: Session, verification_data: VerificationCodeCreate) -> VerificationCode:
+    async def delete_user(self, db: AsyncSession, user_id: int):
+        """Delete a user by their ID."""
+        user = await self.get_user_by_id(db, user_id)
+        await db.delete(user)
+        await response_cache.bump_async(db, user_scope(user_id))
+        await db.commit()
+        user_profiles.invalidate(user_id)
+
+    async def create_verification_code(
+        self, db: AsyncSession, verification_data: VerificationCodeCreate, ttl_seconds: int = 600
+    ) -> VerificationCode:
         """Generate a verification code for the user."""
         code = generate_verification_code()
-        expires_at = datetime.utcnow() + timedelta(minutes=10)
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
 
         verification_code = VerificationCode(
             email=verification_data.email,
@@ -91,22 +119,29 @@ class UsersRepository:
             expires_at=expires_at
         )
         db.add(verification_code)
-        db.commit()
-        db.refresh(verification_code)
+        await db.commit()
         return verification_code
 
-    def verify_code(self, db: Session, email: str, code: str, purpose: str) -> bool:
-        """Verify a given verification code."""
-        verification_entry = db.query(VerificationCode).filter(
-            VerificationCode.email == email,
-            VerificationCode.code == code,
-            VerificationCode.purpose == purpose,
-            VerificationCode.expires_at >= datetime.utcnow()
-        ).first()
-
-        if verification_entry:
-            # Delete the code after successful verification
-            db.delete(verification_entry)
-            db.commit()
-            return True
-        return False
\ No newline at end of file
+    async def verify_code(self, db: AsyncSession, email: str, code: str, purpose: str) -> bool:
+        """
+        Verify a given verification code, consuming it.
+        A single indexed DELETE, so a code cannot be used twice by concurrent requests.
+        """
+        result = await db.execute(
+            delete(VerificationCode).where(
+                VerificationCode.email == email,
+                VerificationCode.code == code,
+                VerificationCode.purpose == purpose,
+                VerificationCode.expires_at >= datetime.utcnow(),
+            )
+        )
+        await db.commit()
+        return result.rowcount > 0
+
+    async def delete_expired_codes(self, db: AsyncSession) -> int:
+        """Bulk-delete every expired verification code."""
+        result = await db.execute(
+            delete(VerificationCode).where(VerificationCode.expires_at < datetime.utcnow())
+        )
+        await db.commit()
+        return result.rowcount
@@ -11,23 +11,21 @@ from fastapi import (
     HTTPException,
     Form,
     status,
-    BackgroundTasks,
 )
 from fastapi.responses import JSONResponse
 from jose import jwt
-from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import EmailStr
 
-from ..repositories.users import UsersRepository
+from ..repositories.users import AsyncUsersRepository
 from ..schemas.verification_code import PasswordResetInitiate, PasswordResetConfirm
 from ..schemas.users import UserCreate, UserLogin, UserUpdate, UserInfo
-from ..database.base import get_db
+from ..database.base import get_async_db
 from ..utils.security import (
-    hash_password,
-    verify_password,
+    password_hasher,
     create_jwt_token,
-    decode_jwt_token,
+    get_current_user,
+    get_current_user_id,
 )
 
 from ..schemas.verification_code import (
@@ -35,7 +33,8 @@ from ..schemas.verification_code import (
     VerificationCodeVerify,
     UserRegistrationData,
 )
-from ..utils.email_utils import send_email
+from ..utils.email_utils import email_outbox
+from ..utils.verification_codes import verification_codes
 from app.config import (
     MAIL_USERNAME,
     MAIL_PASSWORD,
@@ -46,18 +45,15 @@ from app.config import (
 
 
 router = APIRouter()
-users_repository = UsersRepository()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/users/login")
-
+users_repository = AsyncUsersRepository()
 
 # Initiate Registration
 @router.post("/users/register/initiate", status_code=200)
-def initiate_registration(
+async def initiate_registration(
     email: EmailStr,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    existing_user = users_repository.get_user_by_email_reg(db, email)
+    existing_user = await users_repository.get_user_by_email_reg(db, email)
     if existing_user:
         raise HTTPException(
             status_code=400, detail="User with this email already exists"
@@ -65,12 +61,12 @@ def initiate_registration(
 
     # Create a verification code
     verification_data = VerificationCodeCreate(email=email, purpose="registration")
-    verification_code = users_repository.create_verification_code(db, verification_data)
+    code = await verification_codes.issue(verification_data)
 
     # Send verification email
     subject = "Your Registration Verification Code"
-    body = f"Your verification code is: {verification_code.code}"
-    background_tasks.add_task(send_email, email, subject, body)
+    body = f"Your verification code is: {code}"
+    email_outbox.enqueue(email, subject, body)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -80,21 +76,22 @@ def initiate_registration(
 
 # Confirm Registration
 @router.post("/users/register/confirm", status_code=200)
-def confirm_registration(
-    user_input: UserRegistrationData, db: Session = Depends(get_db)
+async def confirm_registration(
+    user_input: UserRegistrationData, db: AsyncSession = Depends(get_async_db)
 ):
     # Verify code
-    is_valid = users_repository.verify_code(
-        db, user_input.email, user_input.code, "registration"
+    is_valid = await verification_codes.verify(
+        user_input.email, user_input.code, "registration"
     )
     if not is_valid:
         raise HTTPException(
             status_code=400, detail="Invalid or expired verification code"
         )
 
-    user_input.password = hash_password(user_input.password)
+    # bcrypt is CPU-bound; it runs in the password hashing processes
+    user_input.password = await password_hasher.hash(user_input.password)
 
-    new_user = users_repository.create_user(db, user_input)
+    new_user = await users_repository.create_user(db, user_input)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -104,17 +101,21 @@ def confirm_registration(
 
 # Login endpoint
 @router.post("/users/login")
-def post_login(
-    username: EmailStr = Form(), password: str = Form(), db: Session = Depends(get_db)
+async def post_login(
+    username: EmailStr = Form(), password: str = Form(), db: AsyncSession = Depends(get_async_db)
 ):
     user_data = UserLogin(email=username, password=password)
-    user = users_repository.get_user_by_email(db, user_data.email)
-    if not verify_password(password, user.password_hashed):
+    user = await users_repository.get_user_by_email(db, user_data.email)
+    is_valid, new_hash = await password_hasher.verify(password, user.password_hashed)
+    if not is_valid:
         raise HTTPException(
             status_code=401,
             detail="Incorrect password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored with outdated bcrypt parameters; upgrade while we have the plain password
+        await users_repository.update_password(db, user, new_hash)
 
     access_token = create_jwt_token(user.user_id)
     return {"access_token": access_token, "token_type": "bearer"}
@@ -122,13 +123,12 @@ def post_login(
 
 # Update user
 @router.patch("/users/me")
-def patch_user(
+async def patch_user(
     user_input: UserUpdate,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user_id = decode_jwt_token(token)
-    updated_user = users_repository.update_user(db, user_id, user_input)
+    updated_user = await users_repository.update_user(db, user_id, user_input)
     serialized_user = {
         "id": updated_user.user_id,
         "fullname": updated_user.fullname,
@@ -142,34 +142,20 @@ def patch_user(
 
 # Get user info
 @router.get("/users/me", response_model=UserInfo, status_code=200)
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
-    user_id = decode_jwt_token(token)
-    user = users_repository.get_user_by_id(db, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-
-    return UserInfo(
-        id=user.user_id,
-        fullname=user.fullname,
-        email=user.email,
-    )
+async def get_me(current_user: UserInfo = Depends(get_current_user)):
+    return current_user
 
 # Delete user
 @router.delete("/users/me", status_code=200)
-def delete_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+async def delete_user(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Delete the current user's account.
     """
-    # Decode the token to get the user's ID
-    user_id = decode_jwt_token(token)
-
     # Call the repository to delete the user
-    users_repository.delete_user(db, user_id)
+    await users_repository.delete_user(db, user_id)
 
     return JSONResponse(
         content={"message": "User account deleted successfully."},
@@ -180,10 +166,9 @@ def delete_user(
 @router.post("/users/password-reset/initiate", status_code=200)
 async def initiate_password_reset(
     password_reset_initiate: PasswordResetInitiate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = users_repository.get_user_by_email(db, password_reset_initiate.email)
+    user = await users_repository.get_user_by_email(db, password_reset_initiate.email)
     if not user:
         raise HTTPException(
             status_code=404, detail="User with this email does not exist."
@@ -192,11 +177,11 @@ async def initiate_password_reset(
     verification_data = VerificationCodeCreate(
         email=password_reset_initiate.email, purpose="password_reset"
     )
-    verification_code = users_repository.create_verification_code(db, verification_data)
+    code = await verification_codes.issue(verification_data)
 
     subject = "Your Password Reset Verification Code"
-    body = f"Your password reset verification code is: {verification_code.code}"
-    background_tasks.add_task(send_email, password_reset_initiate.email, subject, body)
+    body = f"Your password reset verification code is: {code}"
+    email_outbox.enqueue(password_reset_initiate.email, subject, body)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -207,11 +192,11 @@ async def initiate_password_reset(
 # Confirm Password Reset
 @router.post("/users/password-reset/confirm", status_code=200)
 async def confirm_password_reset(
-    password_reset_confirm: PasswordResetConfirm, db: Session = Depends(get_db)
+    password_reset_confirm: PasswordResetConfirm, db: AsyncSession = Depends(get_async_db)
 ):
     # Verify the code
-    is_valid = users_repository.verify_code(
-        db, password_reset_confirm.email, password_reset_confirm.code, "password_reset"
+    is_valid = await verification_codes.verify(
+        password_reset_confirm.email, password_reset_confirm.code, "password_reset"
     )
     if not is_valid:
         raise HTTPException(
@@ -219,13 +204,13 @@ async def confirm_password_reset(
         )
 
     # Retrieve the user
-    user = users_repository.get_user_by_email(db, password_reset_confirm.email)
+    user = await users_repository.get_user_by_email(db, password_reset_confirm.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
 
     # Update the user's password
-    user.password_hashed = hash_password(password_reset_confirm.new_password)
-    db.commit()
+    password_hashed = await password_hasher.hash(password_reset_confirm.new_password)
+    await users_repository.update_password(db, user, password_hashed)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
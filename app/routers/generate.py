@@ -1,29 +1,42 @@
 from sqlite3 import IntegrityError
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordBearer
-from app.schemas.lessons import LessonCreate
-from app.schemas.quizzes import QuizCreate
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.jobs import JobResponse
+from app.schemas.lessons import LessonCreate, LessonTreeCreate
+from app.schemas.quizzes import QuizTreeCreate
 from app.schemas.questions import QuestionCreate
+from app.repositories.jobs import JobsRepository, AsyncJobsRepository
 from app.repositories.lessons import LessonsRepository
 from app.repositories.quizzes import QuizzesRepository
-from app.repositories.questions import QuestionsRepository
-from app.repositories.users import UsersRepository
-from app.utils.security import decode_jwt_token
-from app.utils.lesson_generator import create_lesson
-from app.database.base import get_db, SessionLocal
-import json
-from concurrent.futures import ThreadPoolExecutor
+from app.utils.security import ensure_user_owns_resource, get_current_user_id
+from app.utils.lesson_generator import (
+    create_lesson,
+    stream_lesson,
+    lesson_cache,
+    acreate_outline,
+    acreate_lesson,
+)
+from app.utils.json_stream import IncrementalJSONParser
+from app.utils.job_queue import Heartbeat, JobWorkerPool, worker_id
+from app.database.base import get_async_db, SessionLocal
+from app.config import (
+    CURRICULUM_CONCURRENCY,
+    CURRICULUM_MAX_LESSONS,
+    GENERATION_JOB_LEASE_SECONDS,
+    GENERATION_JOB_MAX_ATTEMPTS,
+)
+from typing import Optional
 import asyncio
+import json
 import logging
 
 
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/users/login")
 
-# Initialize ThreadPoolExecutor
-executor = ThreadPoolExecutor(max_workers=4)
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -32,20 +45,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-users_repository = UsersRepository()
+jobs_repository = JobsRepository()
+async_jobs_repository = AsyncJobsRepository()
 lessons_repository = LessonsRepository()
 quizzes_repository = QuizzesRepository()
-questions_repository = QuestionsRepository()
 
 @router.post("/generate")
 async def generate_lessons(
-     learning_field: str, description: str, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+     learning_field: str, description: str, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint to generate lessons, quizzes, and questions based on the learning field and description.
-    The generation runs in the background to improve response time.
+    The generation is queued as a job; poll `GET /generate/jobs/{job_id}` for its status.
     """
-    user_id = decode_jwt_token(token)
     # Input Validation
     if not description.strip():
         raise HTTPException(status_code=400, detail="Description cannot be empty")
@@ -53,82 +65,288 @@ async def generate_lessons(
     if not learning_field.strip():
         raise HTTPException(status_code=400, detail="Learning field cannot be empty")
 
-    # Schedule background task
-    loop = asyncio.get_event_loop()
-    loop.run_in_executor(
-        executor, generate_lesson_background, user_id, learning_field, description
+    # Persist the job first so it survives a restart, then hand it to a worker
+    job = await async_jobs_repository.create_job(db, user_id, learning_field, description)
+    generation_workers.submit(job.job_id)
+
+    return {"status": job.status, "job_id": job.job_id}
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_generation_job(
+    job_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the status of a lesson generation job.
+    Once the job has succeeded, `lesson_id` points at the generated lesson.
+    """
+    job = await async_jobs_repository.get_job_by_id(db, job_id)
+    ensure_user_owns_resource(job.user_id, user_id)
+    return job
+
+
+@router.get("/cache/stats", dependencies=[Depends(get_current_user_id)])
+def get_lesson_cache_stats():
+    """
+    Hit/miss counters and entry counts of the generated lesson cache.
+    """
+    return lesson_cache.stats()
+
+
+@router.post("/generate/stream")
+def stream_generated_lesson(
+    learning_field: str, description: str, user_id: int = Depends(get_current_user_id)
+):
+    """
+    Generate a lesson and stream it as Server-Sent Events while the model writes it.
+
+    Events, in order: `title`, `description`, one `paragraph` per content block,
+    `lesson` (the lesson row has been saved), one `question` per quiz question,
+    `quiz` (the quiz and its questions have been saved) and finally `done`.
+    An `error` event ends the stream if generation or saving fails.
+    """
+    if not description.strip():
+        raise HTTPException(status_code=400, detail="Description cannot be empty")
+
+    if not learning_field.strip():
+        raise HTTPException(status_code=400, detail="Learning field cannot be empty")
+
+    return StreamingResponse(
+        stream_lesson_events(user_id, learning_field, description),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    return {"status": "processing"}
+
+# Parts of the generated document that are pushed to the client as soon as they are complete
+LESSON_STREAM_PATHS = [
+    ("title",),
+    ("description",),
+    ("content", "*"),
+    ("content",),
+    ("quiz", "questions", "*"),
+    ("quiz",),
+    (),
+]
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
-def generate_lesson_background(user_id: int, learning_field: str, description: str):
+def stream_lesson_events(user_id: int, learning_field: str, description: str):
     """
-    Background task to generate a single lesson, quiz, and questions, and populate the database.
+    Consume the streamed completion, emit SSE events and save the lesson and quiz
+    as soon as each of them is complete.
     """
     db = SessionLocal()
+    parser = IncrementalJSONParser(watch=LESSON_STREAM_PATHS)
+    lesson_fields = {}
+    lesson = None
     try:
-        # Generate lesson JSON
-        lesson_JSON = create_lesson(learning_field, description)
-        lesson_data = json.loads(lesson_JSON)
-
-        logger.info(f"Generated lesson data: {json.dumps(lesson_data, indent=4)}")
-        create_lesson_from_json(lesson_data, db, user_id)
+        for chunk in stream_lesson(learning_field, description):
+            for path, value in parser.feed(chunk):
+                if path in (("title",), ("description",)):
+                    lesson_fields[path[0]] = value
+                    yield sse_event(path[0], {path[0]: value})
+                elif len(path) == 2 and path[0] == "content":
+                    yield sse_event("paragraph", {"index": path[1], "block": value})
+                elif path == ("content",):
+                    lesson = lessons_repository.create_lesson(
+                        db=db,
+                        user_id=user_id,
+                        lesson_data=LessonCreate(
+                            title=lesson_fields.get("title", "Untitled Lesson"),
+                            description=lesson_fields.get("description", ""),
+                            content=value,
+                        ),
+                    )
+                    yield sse_event("lesson", {"lesson_id": lesson.lesson_id})
+                elif len(path) == 3 and path[:2] == ("quiz", "questions"):
+                    yield sse_event("question", {"index": path[2], "question": value})
+                elif path == ("quiz",) and lesson is not None:
+                    quiz = create_quiz_from_json(value, db, lesson.lesson_id)
+                    yield sse_event("quiz", {"quiz_id": quiz.quiz_id})
+                elif path == () and lesson is None:
+                    # The model did not produce a content list; save whatever came back
+                    lesson = create_lesson_from_json(value, db, user_id)
 
-    except json.JSONDecodeError:
-        logger.error("Failed to parse the generated lesson JSON.")
-    except IntegrityError as e:
-        db.rollback()
-        logger.error(f"Integrity error while creating lesson: {str(e)}")
+        if not parser.done:
+            raise ValueError("The generated lesson JSON is incomplete.")
+        yield sse_event("done", {"lesson_id": lesson.lesson_id})
     except Exception as e:
         db.rollback()
-        logger.error(f"An unexpected error occurred: {str(e)}")
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Streaming generation failed: {error}")
+        yield sse_event("error", {"detail": error})
     finally:
         db.close()
 
 
-def create_lesson_from_json(json_data, db: Session, user_id: int):
+@router.post("/curriculum")
+async def generate_curriculum(
+    learning_field: str,
+    description: str,
+    lesson_count: int = Query(5, ge=1, le=CURRICULUM_MAX_LESSONS),
+    user_id: int = Depends(get_current_user_id),
+):
     """
-    Populate a single lesson, quiz, and questions in the database using the JSON structure.
+    Generate a whole course: first an outline of `lesson_count` lesson topics, then
+    every lesson (with its quiz and questions) concurrently.
+    Lessons are saved with `position` following the outline order.
     """
+    if not description.strip():
+        raise HTTPException(status_code=400, detail="Description cannot be empty")
+
+    if not learning_field.strip():
+        raise HTTPException(status_code=400, detail="Learning field cannot be empty")
+
     try:
-        lesson_data_obj = LessonCreate(
-            title=json_data.get("title", "Untitled Lesson"),
-            description=json_data.get("description", ""),
-            content=json_data.get("content", []),
-        )
+        outline = await acreate_outline(learning_field, description, lesson_count)
+    except Exception as e:
+        logger.error(f"Failed to generate curriculum outline: {str(e)}")
+        raise HTTPException(status_code=502, detail="Failed to generate the course outline.")
+    if not outline:
+        raise HTTPException(status_code=502, detail="The generated course outline is empty.")
 
-        lesson = lessons_repository.create_lesson(
-            db=db, user_id=user_id, lesson_data=lesson_data_obj
-        )
+    semaphore = asyncio.Semaphore(CURRICULUM_CONCURRENCY)
 
-        quiz_data = json_data.get("quiz", {})
-        if quiz_data:
-            quiz_data_obj = QuizCreate(
-                title=quiz_data.get("title", "Untitled Quiz"),
-                description=quiz_data.get("description", ""),
+    async def generate_outline_lesson(topic: dict):
+        async with semaphore:
+            lesson_JSON = await acreate_lesson(
+                learning_field, f"{topic['title']}: {topic.get('description', '')}"
             )
+        return json.loads(lesson_JSON)
 
-            quiz = quizzes_repository.create_quiz(
-                db=db, lesson_id=lesson.lesson_id, quiz_data=quiz_data_obj
-            )
+    results = await asyncio.gather(
+        *(generate_outline_lesson(topic) for topic in outline), return_exceptions=True
+    )
+    return await run_in_threadpool(save_curriculum, user_id, outline, results)
 
-            questions = quiz_data.get("questions", [])
-            for question_data in questions:
-                question_data_obj = QuestionCreate(
-                    question_text=question_data.get("question_text", ""),
-                    question_type=question_data.get("question_type", ""),
-                    options=question_data.get("options", []),
-                    correct_answer=question_data.get("correct_answer", ""),
+
+def save_curriculum(user_id: int, outline: list[dict], results: list):
+    """
+    Save generated curriculum lessons in outline order, after the user's existing lessons.
+    """
+    db = SessionLocal()
+    try:
+        first_position = lessons_repository.get_last_position(db, user_id) + 1
+        lessons, failed = [], []
+        for index, (topic, result) in enumerate(zip(outline, results)):
+            position = first_position + index
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                lesson = create_lesson_from_json(result, db, user_id, position=position)
+            except Exception as e:
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Curriculum lesson '{topic['title']}' failed: {error}")
+                failed.append({"position": position, "title": topic["title"], "error": error})
+            else:
+                lessons.append(
+                    {"position": position, "lesson_id": lesson.lesson_id, "title": lesson.title}
                 )
+        return {"outline": [topic["title"] for topic in outline], "lessons": lessons, "failed": failed}
+    finally:
+        db.close()
 
-                questions_repository.create_question(
-                    db=db, quiz_id=quiz.quiz_id, question_data=question_data_obj
+
+def run_generation_job(job_id: int):
+    """
+    Worker entry point: claim a queued job, generate its lesson and record the outcome.
+    The job's lease is renewed while it runs, so other workers do not requeue it.
+    """
+    owner = worker_id()
+    db = SessionLocal()
+    try:
+        job = jobs_repository.claim_job(db, job_id, owner)
+        if job is None:
+            return
+
+        try:
+            with Heartbeat(lambda: renew_job_lease(job_id, owner), GENERATION_JOB_LEASE_SECONDS / 3):
+                lesson = generate_lesson_background(
+                    job.user_id, job.learning_field, job.description, db
                 )
+        except Exception as e:
+            db.rollback()
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Generation job {job_id} failed: {error}")
+            jobs_repository.mark_failed(db, job_id, owner, error)
+        else:
+            jobs_repository.mark_succeeded(db, job_id, owner, lesson.lesson_id)
+            logger.info(f"Generation job {job_id} produced lesson {lesson.lesson_id}")
+    finally:
+        db.close()
+
+
+def renew_job_lease(job_id: int, owner: str):
+    db = SessionLocal()
+    try:
+        if not jobs_repository.renew_lease(db, job_id, owner):
+            logger.warning(f"Generation job {job_id} is no longer leased to this worker")
+    finally:
+        db.close()
+
+
+def resume_generation_jobs() -> int:
+    """
+    Re-schedule queued jobs, and jobs whose worker stopped renewing their lease.
+    Safe to run from every worker process: jobs of live workers are left alone.
+    """
+    db = SessionLocal()
+    try:
+        _, failed = jobs_repository.requeue_interrupted_jobs(
+            db, GENERATION_JOB_LEASE_SECONDS, GENERATION_JOB_MAX_ATTEMPTS
+        )
+        job_ids = jobs_repository.get_queued_job_ids(db)
+    finally:
+        db.close()
+    if failed:
+        logger.warning(f"Gave up on {failed} generation job(s) interrupted {GENERATION_JOB_MAX_ATTEMPTS} times")
+    return generation_workers.resume(job_ids)
+
+
+generation_workers = JobWorkerPool(run_generation_job, max_workers=4, name="generate")
+
+
+def generate_lesson_background(
+    user_id: int, learning_field: str, description: str, db: Session
+):
+    """
+    Generate a single lesson, quiz, and questions, and populate the database.
+    """
+    # Generate lesson JSON
+    lesson_JSON = create_lesson(learning_field, description)
+    try:
+        lesson_data = json.loads(lesson_JSON)
+    except json.JSONDecodeError:
+        raise ValueError("Failed to parse the generated lesson JSON.")
+
+    logger.info(f"Generated lesson data: {json.dumps(lesson_data, indent=4)}")
+    return create_lesson_from_json(lesson_data, db, user_id)
+
+
+def create_lesson_from_json(json_data, db: Session, user_id: int, position: int = None):
+    """
+    Populate a single lesson, quiz, and questions in the database using the JSON structure.
+    The whole tree is written in one transaction.
+    """
+    try:
+        lesson_data_obj = LessonTreeCreate(
+            title=json_data.get("title", "Untitled Lesson"),
+            description=json_data.get("description", ""),
+            position=position,
+            content=json_data.get("content", []),
+            quiz=quiz_tree_from_json(json_data.get("quiz", {})),
+        )
+
+        lesson = lessons_repository.create_lesson_tree(
+            db=db, user_id=user_id, lesson_data=lesson_data_obj
+        )
 
-        db.commit()
         logger.info("Lesson, quiz, and questions created successfully.")
-        return {"detail": "Lesson created successfully"}
+        return lesson
 
     except IntegrityError as e:
         db.rollback()
@@ -140,3 +358,31 @@ def create_lesson_from_json(json_data, db: Session, user_id: int):
         raise HTTPException(
             status_code=500, detail=f"An unexpected error occurred: {str(e)}"
         )
+
+
+def create_quiz_from_json(quiz_data, db: Session, lesson_id: int):
+    """
+    Populate the quiz and questions of an existing lesson using the JSON structure.
+    """
+    return quizzes_repository.create_quiz_tree(
+        db=db, lesson_id=lesson_id, quiz_data=quiz_tree_from_json(quiz_data)
+    )
+
+
+def quiz_tree_from_json(quiz_data) -> Optional[QuizTreeCreate]:
+    if not quiz_data:
+        return None
+
+    return QuizTreeCreate(
+        title=quiz_data.get("title", "Untitled Quiz"),
+        description=quiz_data.get("description", ""),
+        questions=[
+            QuestionCreate(
+                question_text=question_data.get("question_text", ""),
+                question_type=question_data.get("question_type", ""),
+                options=question_data.get("options", []),
+                correct_answer=question_data.get("correct_answer", ""),
+            )
+            for question_data in quiz_data.get("questions", [])
+        ],
+    )
@@ -1,82 +1,221 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from app.repositories.lessons import LessonsRepository
-from app.schemas.lessons import LessonCreate, LessonUpdate, LessonResponse
-from app.database.base import get_db
-from app.utils.security import decode_jwt_token
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.repositories.lessons import AsyncLessonsRepository
+from app.schemas.lessons import (
+    LessonCreate,
+    LessonUpdate,
+    LessonResponse,
+    LessonFullResponse,
+    LessonSummaryPage,
+)
+from app.database.base import AsyncSessionLocal, get_async_db
+from app.utils.security import ensure_user_owns_resource, get_current_user_id
+from app.utils.audio_pipeline import audio_locations
+from app.utils.http_cache import ETagFileResponse, FileETags, etag_matches
+from app.utils.lesson_payloads import lesson_json, lessons_json
+from app.utils.lesson_transfer import NDJSON_MEDIA_TYPE, lesson_tree_line, parse_lesson_trees
+from app.utils.response_cache import cached_response, user_scope
+from app.config import LESSONS_PAGE_SIZE, LESSONS_MAX_PAGE_SIZE
+from typing import Optional
 import os
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/users/login")
-lessons_repository = LessonsRepository()
+lessons_repository = AsyncLessonsRepository()
+audio_etags = FileETags()
+
+# The URL stays the same when an edit re-renders the audio, so clients may store the
+# file but must revalidate it with the ETag (a 304 while unchanged) before each reuse
+AUDIO_CACHE_CONTROL = "no-cache"
 
 @router.get("/lessons", response_model=list[LessonResponse])
-def get_user_lessons(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_user_lessons(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="Return lessons after this lesson ID"),
+    limit: int = Query(LESSONS_PAGE_SIZE, ge=1, le=LESSONS_MAX_PAGE_SIZE),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Get all lessons for the current user.
+    Get one page of the current user's lessons, ordered by ID.
+    Pass the last `lesson_id` of a page as the next `cursor`; use `GET /lessons/export` to get them all.
+    Served from the response cache with an ETag; `If-None-Match` gets a 304.
     """
-    user_id = decode_jwt_token(token)
-    return lessons_repository.get_user_lessons(db, user_id)
+
+    async def load() -> bytes:
+        return lessons_json(await lessons_repository.get_user_lesson_payload_rows(db, user_id, cursor, limit))
+
+    return await cached_response(request, db, ("lessons", user_id, cursor, limit), user_scope(user_id), load)
+
+
+@router.get("/lessons/summary", response_model=LessonSummaryPage)
+async def get_user_lesson_summaries(
+    cursor: Optional[int] = Query(None, description="`next_cursor` of the previous page"),
+    limit: int = Query(LESSONS_PAGE_SIZE, ge=1, le=LESSONS_MAX_PAGE_SIZE),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get one page of the current user's lessons without their content.
+    """
+    items, next_cursor = await lessons_repository.get_user_lesson_summaries(db, user_id, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.post("/lessons", response_model=LessonResponse)
-def create_lesson(
-    lesson_data: LessonCreate, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+async def create_lesson(
+    lesson_data: LessonCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new lesson for the current user.
     """
-    user_id = decode_jwt_token(token)
-    return lessons_repository.create_lesson(db, user_id, lesson_data)
+    return await lessons_repository.create_lesson(db, user_id, lesson_data)
+
+
+@router.get("/lessons/export", response_class=StreamingResponse)
+async def export_lessons(user_id: int = Depends(get_current_user_id)):
+    """
+    Stream all lessons of the current user with their quizzes and questions as NDJSON,
+    one lesson per line in the format `POST /lessons/import` accepts.
+    """
+
+    async def lines():
+        # Dependency sessions are closed before a streamed body is sent, so the export opens its own
+        async with AsyncSessionLocal() as db:
+            async for trees in lessons_repository.iter_lesson_trees(db, user_id):
+                yield b"".join(lesson_tree_line(*tree) for tree in trees)
+
+    return StreamingResponse(
+        lines(),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="lessons.ndjson"'},
+    )
+
+
+@router.post("/lessons/import")
+async def import_lessons(
+    request: Request, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create lessons for the current user from an NDJSON body, one lesson with its quiz
+    and questions per line (the `GET /lessons/export` format). The body is read and
+    saved as it arrives, in batches of `LESSON_TRANSFER_BATCH_SIZE` lessons.
+    """
+    return await lessons_repository.import_lesson_trees(db, user_id, parse_lesson_trees(request.stream()))
+
+
+@router.get("/lessons/{lesson_id}", response_model=LessonResponse)
+async def get_lesson(
+    lesson_id: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get a lesson by ID for the current user.
+    Served from the response cache with an ETag; `If-None-Match` gets a 304.
+    """
+
+    async def load() -> bytes:
+        row = await lessons_repository.get_lesson_payload_row(db, lesson_id)
+        ensure_user_owns_resource(row.user_id, user_id)
+        return lesson_json(row)
+
+    # Any change to the user's lessons bumps the user scope, this one included
+    return await cached_response(request, db, ("lesson", lesson_id, user_id), user_scope(user_id), load)
+
+
+@router.get("/lessons/{lesson_id}/full", response_model=LessonFullResponse)
+async def get_full_lesson(
+    lesson_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a lesson with its quiz and questions in one response.
+    """
+    lesson = await lessons_repository.get_lesson_tree(db, lesson_id)
+    ensure_user_owns_resource(lesson.user_id, user_id)
+    return lesson
 
 
 @router.put("/lessons/{lesson_id}", response_model=LessonResponse)
-def update_lesson(
+async def update_lesson(
     lesson_id: int,
     lesson_data: LessonUpdate,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Update a lesson by ID for the current user.
     """
-    user_id = decode_jwt_token(token)
-    lesson = lessons_repository.get_lesson_by_id(db, lesson_id)
+    lesson = await lessons_repository.get_lesson_by_id(db, lesson_id)
     if lesson.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this lesson")
-    return lessons_repository.update_lesson(db, lesson_id, lesson_data)
+    return await lessons_repository.update_lesson(db, lesson_id, lesson_data)
 
 
 @router.delete("/lessons/{lesson_id}")
-def delete_lesson(lesson_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def delete_lesson(lesson_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)):
     """
     Delete a lesson by ID for the current user.
     """
-    user_id = decode_jwt_token(token)
-    lesson = lessons_repository.get_lesson_by_id(db, lesson_id)
+    lesson = await lessons_repository.get_lesson_by_id(db, lesson_id)
     if lesson.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this lesson")
-    lessons_repository.delete_lesson(db, lesson_id)
+    await lessons_repository.delete_lesson(db, lesson_id)
     return {"detail": "Lesson deleted successfully"}
 
 @router.get("/lessons/{lesson_id}/audio", response_class=FileResponse)
-def get_audio_for_lesson(
+async def get_audio_for_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve the audio file for the specified lesson.
+    Supports byte ranges for seeking and `If-None-Match` revalidation against a content-based ETag.
     """
-    # Use the correct method to fetch the lesson
-    lesson = lessons_repository.get_lesson_by_id(db, lesson_id)
+    audio_path = audio_locations.get(lesson_id)
+    if audio_path is None:
+        lesson = await lessons_repository.get_lesson_by_id(db, lesson_id)
 
-    if not lesson.audio_file_path or not os.path.exists(lesson.audio_file_path):
+        if not lesson.audio_file_path or not os.path.exists(lesson.audio_file_path):
+            if lesson.audio_status in ("pending", "rendering"):
+                raise HTTPException(status_code=404, detail="Audio is still being generated")
+            raise HTTPException(status_code=404, detail="Audio file not found")
+
+        audio_path = lesson.audio_file_path
+        audio_locations.set(lesson_id, audio_path)
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, audio_path)
+    except FileNotFoundError:
+        audio_locations.invalidate(lesson_id)
         raise HTTPException(status_code=404, detail="Audio file not found")
 
-    return FileResponse(
-        path=lesson.audio_file_path,
+    etag = await run_in_threadpool(audio_etags.get, audio_path, stat_result)
+    headers = {"Cache-Control": AUDIO_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    return ETagFileResponse(
+        audio_path,
+        etag,
+        stat_result,
+        headers=headers,
         media_type="audio/mpeg",
-        filename=os.path.basename(lesson.audio_file_path),
-    )
\ No newline at end of file
+        filename=os.path.basename(audio_path),
+    )
+
+
+@router.post("/lessons/{lesson_id}/audio/retry", response_model=LessonResponse)
+async def retry_lesson_audio(
+    lesson_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue a new audio render for a lesson whose previous render failed.
+    """
+    lesson = await lessons_repository.get_lesson_by_id(db, lesson_id)
+    if lesson.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to update this lesson")
+    return await lessons_repository.retry_lesson_audio(db, lesson_id)
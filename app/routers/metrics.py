@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends
+
+from app.database.base import engine, async_engine
+from app.database.engine import pool_status
+from app.utils.security import get_current_user_id, password_hasher
+from app.utils.email_utils import email_outbox
+from app.utils.answer_keys import answer_keys
+from app.utils.response_cache import response_cache
+
+# Operational data; only served to signed-in users
+router = APIRouter(dependencies=[Depends(get_current_user_id)])
+
+
+@router.get("/database")
+def get_database_metrics():
+    """
+    Connection pool usage and checkout wait times of the sync and async engines.
+    """
+    return {
+        "backend": engine.dialect.name,
+        "sync_pool": pool_status(engine),
+        "async_pool": pool_status(async_engine.sync_engine),
+    }
+
+
+@router.get("/passwords")
+def get_password_hashing_metrics():
+    """
+    Queue depth and throughput of the password hashing processes.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/email")
+def get_email_outbox_metrics():
+    """
+    Backlog, retries and SMTP connection reuse of the email outbox.
+    """
+    return email_outbox.stats()
+
+
+@router.get("/answer-keys")
+def get_answer_key_metrics():
+    """
+    Hit rate and size of the quiz answer key cache.
+    """
+    return answer_keys.stats()
+
+
+@router.get("/responses")
+def get_response_cache_metrics():
+    """
+    Hit rate, size and invalidations of the lesson, quiz and question response cache.
+    """
+    return response_cache.stats()
@@ -1,148 +1,174 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordBearer
-from app.repositories.quizzes import QuizzesRepository
-from app.repositories.questions import QuestionsRepository
-from app.repositories.lessons import LessonsRepository
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.models import Lesson, Quiz
+from app.repositories.quizzes import AsyncQuizzesRepository
+from app.repositories.questions import AsyncQuestionsRepository
+from app.repositories.attempts import AsyncQuizAttemptsRepository
 from app.schemas.quizzes import (
     QuizCreate,
     QuizUpdate,
     QuizResponse,
     QuizSubmission,
     QuizSubmissionResult,
+    QuizBatchSubmission,
+    QuizBatchSubmissionResult,
+    QuizStatsResponse,
 )
-from app.database.base import get_db
-from app.utils.security import decode_jwt_token, ensure_user_owns_resource
+from app.config import QUIZ_BATCH_MAX_SUBMISSIONS
+from app.database.base import get_async_db
+from app.utils.ownership import get_owned_lesson, get_owned_quiz
+from app.utils.security import get_current_user_id
+from app.utils.answer_keys import AnswerKey
+from app.utils.response_cache import cached_json_response, lesson_scope, quiz_scope
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/users/login")
 
-lessons_repository = LessonsRepository()
-quizzes_repository = QuizzesRepository()
-questions_repository = QuestionsRepository()
+quizzes_repository = AsyncQuizzesRepository()
+questions_repository = AsyncQuestionsRepository()
+attempts_repository = AsyncQuizAttemptsRepository()
 
 
 @router.get("/quizzes/{quiz_id}", response_model=QuizResponse)
-def get_quiz(
-    quiz_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+async def get_quiz(
+    quiz_id: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve a single quiz by ID.
+    Served from the response cache with an ETag; `If-None-Match` gets a 304.
     """
-    user_id = decode_jwt_token(token)
-    quiz = quizzes_repository.get_quiz_by_id(db, quiz_id)
-    lesson = lessons_repository.get_lesson_by_id(db, quiz.lesson_id)
-    ensure_user_owns_resource(lesson.user_id, user_id)
-    return quiz
+    return await cached_json_response(
+        request,
+        db,
+        ("quiz", quiz_id, user_id),
+        quiz_scope(quiz_id),
+        QuizResponse,
+        lambda: get_owned_quiz(quiz_id, user_id, db),
+    )
 
 
 @router.get("/quizzes/lesson/{lesson_id}", response_model=QuizResponse)
-def get_lesson_quiz(
-    lesson_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+async def get_lesson_quiz(
+    lesson_id: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve the quiz for a specific lesson.
+    Served from the response cache with an ETag; `If-None-Match` gets a 304.
     """
-    user_id = decode_jwt_token(token)
-    lesson = lessons_repository.get_lesson_by_id(db, lesson_id)
-    ensure_user_owns_resource(lesson.user_id, user_id)
-    return quizzes_repository.get_lesson_quiz(db, lesson_id)
+
+    async def load():
+        lesson = await get_owned_lesson(lesson_id, user_id, db)
+        return await quizzes_repository.get_lesson_quiz(db, lesson.lesson_id)
+
+    return await cached_json_response(
+        request, db, ("lesson-quiz", lesson_id, user_id), lesson_scope(lesson_id), QuizResponse, load
+    )
 
 
 @router.post("/quizzes", response_model=QuizResponse)
-def create_quiz(
-    lesson_id: int,
+async def create_quiz(
     quiz_data: QuizCreate,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    lesson: Lesson = Depends(get_owned_lesson),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Create a new quiz for a lesson.
     """
-    user_id = decode_jwt_token(token)
-    lesson = lessons_repository.get_lesson_by_id(db, lesson_id)
-    ensure_user_owns_resource(lesson.user_id, user_id)
-    return quizzes_repository.create_quiz(db, lesson_id, quiz_data)
+    return await quizzes_repository.create_quiz(db, lesson.lesson_id, quiz_data)
 
 
 @router.put("/quizzes/{quiz_id}", response_model=QuizResponse)
-def update_quiz(
-    quiz_id: int,
+async def update_quiz(
     quiz_data: QuizUpdate,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    quiz: Quiz = Depends(get_owned_quiz),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Update an existing quiz by ID.
     """
-    user_id = decode_jwt_token(token)
-    quiz = quizzes_repository.get_quiz_by_id(db, quiz_id)
-    lesson = lessons_repository.get_lesson_by_id(db, quiz.lesson_id)
-    ensure_user_owns_resource(lesson.user_id, user_id)
-    return quizzes_repository.update_quiz(db, quiz_id, quiz_data)
+    return await quizzes_repository.update_quiz(db, quiz, quiz_data)
 
 
 @router.delete("/quizzes/{quiz_id}")
-def delete_quiz(
-    quiz_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
+async def delete_quiz(quiz: Quiz = Depends(get_owned_quiz), db: AsyncSession = Depends(get_async_db)):
     """
     Delete a quiz by ID.
     """
-    user_id = decode_jwt_token(token)
-    quiz = quizzes_repository.get_quiz_by_id(db, quiz_id)
-    lesson = lessons_repository.get_lesson_by_id(db, quiz.lesson_id)
-    ensure_user_owns_resource(lesson.user_id, user_id)
-    quizzes_repository.delete_quiz(db, quiz_id)
+    await quizzes_repository.delete_quiz(db, quiz)
     return {"detail": "Quiz deleted successfully"}
 
 
 @router.post("/quizzes/{quiz_id}/submit", response_model=QuizSubmissionResult)
-def submit_quiz(
-    quiz_id: int,
+async def submit_quiz(
     submission: QuizSubmission,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    quiz: Quiz = Depends(get_owned_quiz),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Submit a quiz and evaluate the answers.
     Returns the number of correct answers and the correct answers for each question.
+    The attempt is recorded and counted in the quiz statistics.
     """
-    user_id = decode_jwt_token(token)
-
-    quiz = quizzes_repository.get_quiz_by_id(db, quiz_id)
-
-    lesson = lessons_repository.get_lesson_by_id(db, quiz.lesson_id)
-    ensure_user_owns_resource(lesson.user_id, user_id)
-
-    questions = questions_repository.get_quiz_questions(db, quiz_id)
+    answer_key = await questions_repository.get_answer_key(db, quiz.quiz_id)
+    outcomes = answer_key.check(submission.answers)
+    [attempt_id] = await attempts_repository.record_attempts(
+        db, quiz.quiz_id, user_id, answer_key, [outcomes]
+    )
+    return _submission_result(answer_key, outcomes, attempt_id)
 
-    if not questions:
-        raise HTTPException(status_code=400, detail="Quiz has no questions.")
 
-    correct_count = 0
-    correct_answers = {}
+@router.post("/quizzes/{quiz_id}/submit/batch", response_model=QuizBatchSubmissionResult)
+async def submit_quiz_batch(
+    batch: QuizBatchSubmission,
+    quiz: Quiz = Depends(get_owned_quiz),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Evaluate many submissions of a quiz against its answer key at once.
+    Results are returned in the order of the submissions; all attempts are recorded together.
+    """
+    if len(batch.submissions) > QUIZ_BATCH_MAX_SUBMISSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {QUIZ_BATCH_MAX_SUBMISSIONS} submissions.",
+        )
+    if not batch.submissions:
+        return QuizBatchSubmissionResult(results=[])
+
+    answer_key = await questions_repository.get_answer_key(db, quiz.quiz_id)
+    graded = [answer_key.check(submission.answers) for submission in batch.submissions]
+    attempt_ids = await attempts_repository.record_attempts(
+        db, quiz.quiz_id, user_id, answer_key, graded
+    )
+    return QuizBatchSubmissionResult(
+        results=[
+            _submission_result(answer_key, outcomes, attempt_id)
+            for outcomes, attempt_id in zip(graded, attempt_ids)
+        ]
+    )
 
-    for question in questions:
-        user_answer = submission.answers.get((question.question_id))
-        if user_answer is None:
-            continue
 
-        if (
-            question.question_type == "multiple_choice"
-            and user_answer == question.correct_answer
-        ):
-            correct_count += 1
-        elif (
-            question.question_type == "true_false"
-            and user_answer.lower() == question.correct_answer.lower()
-        ):
-            correct_count += 1
+@router.get("/quizzes/{quiz_id}/stats", response_model=QuizStatsResponse)
+async def get_quiz_stats(quiz: Quiz = Depends(get_owned_quiz), db: AsyncSession = Depends(get_async_db)):
+    """
+    Attempt count, average score and per-question answer statistics of a quiz.
+    """
+    return await attempts_repository.get_quiz_stats(db, quiz.quiz_id)
 
-        correct_answers[question.question_id] = question.correct_answer
 
+def _submission_result(answer_key: AnswerKey, outcomes: list, attempt_id: int) -> QuizSubmissionResult:
     return QuizSubmissionResult(
-        total_questions=len(questions),
-        correct_count=correct_count,
-        correct_answers=correct_answers,
+        attempt_id=attempt_id,
+        total_questions=answer_key.total_questions,
+        correct_count=sum(1 for _, _, is_correct in outcomes if is_correct),
+        correct_answers={
+            question_id: answer_key.correct_answers[question_id] for question_id, _, _ in outcomes
+        },
     )
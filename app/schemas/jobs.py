@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class JobResponse(BaseModel):
+    """
+    Schema for the status of a lesson generation job.
+    `status` is one of "queued", "running", "succeeded" or "failed".
+    """
+
+    job_id: int
+    status: str
+    learning_field: str
+    description: str
+    lesson_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "job_id": 1,
+                "status": "succeeded",
+                "learning_field": "Go",
+                "description": "Basics of the Go programming language",
+                "lesson_id": 12,
+                "error": None,
+                "attempts": 1,
+                "created_at": "2024-12-14T18:02:41",
+                "updated_at": "2024-12-14T18:03:10",
+            }
+        }
@@ -1,10 +1,12 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
+from .quizzes import QuizTreeCreate, QuizTreeResponse
 
 
 class LessonBase(BaseModel):
     title: str
     description: Optional[str] = None
+    position: Optional[int] = None
     content: Optional[List[dict]] = None
 
 
@@ -26,6 +28,14 @@ class LessonCreate(LessonBase):
         }
 
 
+class LessonTreeCreate(LessonCreate):
+    """
+    Schema for creating a lesson together with its quiz and questions.
+    """
+
+    quiz: Optional[QuizTreeCreate] = None
+
+
 class LessonUpdate(BaseModel):
     """
     Schema for updating a lesson.
@@ -33,6 +43,7 @@ class LessonUpdate(BaseModel):
 
     title: Optional[str] = None
     description: Optional[str] = None
+    position: Optional[int] = None
     content: Optional[List[dict]] = None
 
     class Config:
@@ -51,6 +62,46 @@ class LessonResponse(LessonBase):
 
     lesson_id: int
     user_id: int
+    audio_status: Optional[str] = None  # "pending", "rendering", "ready" or "failed"
 
     class Config:
         orm_mode = True
+
+
+class LessonFullResponse(LessonResponse):
+    """
+    Schema for a lesson together with its quiz and the quiz's questions.
+    """
+
+    quiz: Optional[QuizTreeResponse] = None
+
+    @validator("quiz", pre=True)
+    def first_quiz(cls, value):
+        # Lesson.quiz is a one-to-many relationship, but a lesson has at most one quiz
+        if isinstance(value, list):
+            return value[0] if value else None
+        return value
+
+
+class LessonSummary(BaseModel):
+    """
+    Schema for a lesson in a listing, without its content.
+    """
+
+    lesson_id: int
+    title: str
+    description: Optional[str] = None
+    position: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+
+class LessonSummaryPage(BaseModel):
+    """
+    Schema for one page of lesson summaries.
+    Pass `next_cursor` as `cursor` to get the next page; it is null on the last page.
+    """
+
+    items: List[LessonSummary]
+    next_cursor: Optional[int] = None
@@ -1,5 +1,6 @@
-from typing import Optional, Dict
+from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
+from .questions import QuestionCreate, QuestionResponse
 
 
 class QuizBase(BaseModel):
@@ -21,6 +22,14 @@ class QuizCreate(QuizBase):
         }
 
 
+class QuizTreeCreate(QuizCreate):
+    """
+    Schema for creating a quiz together with its questions.
+    """
+
+    questions: List[QuestionCreate] = []
+
+
 class QuizUpdate(BaseModel):
     """
     Schema for updating a quiz.
@@ -50,6 +59,14 @@ class QuizResponse(QuizBase):
         orm_mode = True
 
 
+class QuizTreeResponse(QuizResponse):
+    """
+    Schema for a quiz together with its questions.
+    """
+
+    questions: List[QuestionResponse] = []
+
+
 class QuizSubmission(BaseModel):
     """
     Schema for submitting quiz answers.
@@ -74,6 +91,7 @@ class QuizSubmissionResult(BaseModel):
     Schema for the result of a quiz submission.
     """
 
+    attempt_id: Optional[int] = None
     total_questions: int
     correct_count: int
     correct_answers: Dict[int, str] = Field(
@@ -86,3 +104,73 @@ class QuizSubmissionResult(BaseModel):
             5: "false",
         },
     )
+
+
+class QuizBatchSubmission(BaseModel):
+    """
+    Schema for grading many submissions of the same quiz in one request.
+    """
+
+    submissions: List[QuizSubmission]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "submissions": [
+                    {"answers": {1: "Robert Griesemer, Rob Pike, and Ken Thompson", 2: "false"}},
+                    {"answers": {1: "Guido van Rossum", 2: "true"}},
+                ]
+            }
+        }
+
+
+class QuizBatchSubmissionResult(BaseModel):
+    """
+    Schema for the results of a batch submission, in the order the submissions were sent.
+    """
+
+    results: List[QuizSubmissionResult]
+
+
+class QuestionStatsResponse(BaseModel):
+    """
+    Schema for the answer statistics of one question.
+    `answers` maps each submitted answer to how often it was given.
+    """
+
+    question_id: int
+    question_text: str
+    attempt_count: int
+    correct_count: int
+    correct_rate: Optional[float] = None
+    answers: Dict[str, int] = {}
+
+
+class QuizStatsResponse(BaseModel):
+    """
+    Schema for the statistics of a quiz across all recorded attempts.
+    """
+
+    quiz_id: int
+    attempt_count: int
+    average_correct: Optional[float] = None
+    questions: List[QuestionStatsResponse] = []
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "quiz_id": 1,
+                "attempt_count": 30,
+                "average_correct": 3.4,
+                "questions": [
+                    {
+                        "question_id": 2,
+                        "question_text": "Go has classes.",
+                        "attempt_count": 30,
+                        "correct_count": 12,
+                        "correct_rate": 0.4,
+                        "answers": {"false": 12, "true": 18},
+                    }
+                ],
+            }
+        }
@@ -0,0 +1,83 @@
+"""
+Startup-time benchmark.
+
+Imports `app.main` and builds the application with `create_app()` in fresh
+interpreters, reports the median time of each step and the slowest packages
+from `python -X importtime`, and checks that the dependencies which are only
+needed at request time (OpenAI SDK, TTS engine) were not loaded. Exits non-zero
+if one was, or if importing took longer than `--max-import-ms`, so it can gate CI:
+
+    python -m app.startup_benchmark --runs 5 --max-import-ms 2500
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Loaded on first use; importing one of these at startup is a regression
+DEFERRED_MODULES = ("openai", "edge_tts", "aiohttp", "requests")
+
+_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+app.main.create_app()
+built = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (built - imported) * 1000,
+    "deferred_loaded": [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_probe() -> tuple[dict, list[tuple[int, str]]]:
+    """Time one cold start; returns the timings and (cumulative µs, package) per top-level package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit() and "." not in name:
+            packages[name] = max(packages.get(name, 0), int(cumulative))
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, sorted(((us, name) for name, us in packages.items()), reverse=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="fail above this median import time")
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    import_ms = statistics.median(timings["import_ms"] for timings, _ in runs)
+    create_app_ms = statistics.median(timings["create_app_ms"] for timings, _ in runs)
+    print(f"import app.main: {import_ms:.0f} ms (median of {args.runs})")
+    print(f"create_app():    {create_app_ms:.1f} ms")
+    print("slowest packages (cumulative import time, last run):")
+    for us, name in runs[-1][1][: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    loaded = sorted({name for timings, _ in runs for name in timings["deferred_loaded"]})
+    if loaded:
+        failures.append(f"loaded at startup: {', '.join(loaded)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.0f} ms, budget is {args.max_import_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from ..config import ANSWER_KEY_CACHE_SIZE, ANSWER_KEY_CACHE_TTL_SECONDS
+
+
+class AnswerKey:
+    """
+    The correct answers of one quiz, normalized once so checking a submission
+    is a dict lookup and a string comparison per answered question.
+    Multiple-choice answers must match exactly; true/false answers ignore case.
+    """
+
+    __slots__ = ("total_questions", "correct_answers", "_expected", "_folded")
+
+    def __init__(self, rows: Iterable[tuple[int, str, str]]):
+        self.correct_answers = {}  # question_id -> correct answer as stored
+        self._expected = {}  # question_id -> answer to compare against
+        self._folded = set()  # question_ids compared case-insensitively
+        for question_id, question_type, correct_answer in rows:
+            self.correct_answers[question_id] = correct_answer
+            if question_type == "multiple_choice":
+                self._expected[question_id] = correct_answer
+            elif question_type == "true_false":
+                self._expected[question_id] = correct_answer.lower()
+                self._folded.add(question_id)
+        self.total_questions = len(self.correct_answers)
+
+    def check(self, answers: dict[int, str]) -> list[tuple[int, str, bool]]:
+        """
+        (question_id, normalized answer, is_correct) for every answered question of the quiz.
+        Answers to questions outside the quiz are ignored.
+        """
+        outcomes = []
+        for question_id, answer in answers.items():
+            if question_id not in self.correct_answers:
+                continue
+            if question_id in self._folded:
+                answer = answer.lower()
+            outcomes.append((question_id, answer, answer == self._expected.get(question_id)))
+        return outcomes
+
+
+class AnswerKeyCache:
+    """
+    LRU of answer keys by quiz ID. Repositories invalidate a quiz whenever its
+    questions change; entries also expire after `ttl_seconds` so changes made by
+    another process are picked up.
+    """
+
+    def __init__(self, ttl_seconds: float = ANSWER_KEY_CACHE_TTL_SECONDS, max_entries: int = ANSWER_KEY_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._keys = OrderedDict()  # quiz_id -> (expires_at, AnswerKey)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, quiz_id: int) -> Optional[AnswerKey]:
+        with self._lock:
+            entry = self._keys.get(quiz_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._keys.move_to_end(quiz_id)
+                self._counters["hits"] += 1
+                return entry[1]
+            self._keys.pop(quiz_id, None)
+            self._counters["misses"] += 1
+            return None
+
+    def generation(self) -> int:
+        """Read before loading a key from the database and pass to `set`."""
+        with self._lock:
+            return self._generation
+
+    def set(self, quiz_id: int, answer_key: AnswerKey, generation: int):
+        with self._lock:
+            # Something was invalidated while the key was loading; it may be stale
+            if generation != self._generation:
+                return
+            self._keys[quiz_id] = (time.monotonic() + self.ttl_seconds, answer_key)
+            self._keys.move_to_end(quiz_id)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+
+    def invalidate(self, quiz_id: int):
+        with self._lock:
+            self._generation += 1
+            self._keys.pop(quiz_id, None)
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "entries": len(self._keys)}
+
+
+answer_keys = AnswerKeyCache()
@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from ..config import (
+    AUDIO_WORKERS,
+    AUDIO_MAX_ATTEMPTS,
+    AUDIO_RETRY_DELAY_SECONDS,
+    AUDIO_BLOCK_CONCURRENCY,
+    AUDIO_ORPHAN_BLOCK_AGE_SECONDS,
+    AUDIO_RENDER_TIMEOUT_SECONDS,
+)
+from ..database.base import SessionLocal
+from ..database.models import Lesson
+from ..repositories.audio import AudioAssetsRepository
+from .job_queue import JobWorkerPool
+from .response_cache import response_cache, user_scope
+from .tts import (
+    AUDIO_DIR,
+    BLOCK_DIR,
+    audio_content_hash,
+    audio_filename_for_hash,
+    concatenate_audio,
+    delete_audio_file,
+    extract_text_blocks,
+    lesson_audio_hash,
+    synthesize_blocks,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOICE = "en-US-GuyNeural"
+
+audio_assets_repository = AudioAssetsRepository()
+
+
+class AudioLocations:
+    """
+    Short-lived map of lesson ID -> audio file path, so serving audio does not need
+    a database query on every play or seek. Entries are dropped as soon as this
+    process changes a lesson's audio, and expire after `ttl_seconds` to pick up
+    changes made by other processes.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def get(self, lesson_id: int) -> Optional[str]:
+        with self._lock:
+            entry = self._paths.get(lesson_id)
+            if entry is None:
+                return None
+            path, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._paths[lesson_id]
+                return None
+            return path
+
+    def set(self, lesson_id: int, path: str):
+        with self._lock:
+            if len(self._paths) >= self.max_entries:
+                self._paths.clear()
+            self._paths[lesson_id] = (path, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, lesson_id: int):
+        with self._lock:
+            self._paths.pop(lesson_id, None)
+
+
+audio_locations = AudioLocations()
+
+
+def needs_audio(content) -> bool:
+    return bool(content) and bool(extract_text_blocks(content))
+
+
+def render_lesson_audio(lesson_id: int):
+    """
+    Render the audio of a lesson whose `audio_status` is `pending`.
+
+    The lesson is first claimed (moved to `rendering`), so of several workers told
+    to render it only one does. Each text block is synthesized separately
+    (concurrently, and cached by its own hash) and the blocks are joined into the
+    lesson's MP3, so re-rendering an edited lesson only synthesizes the blocks that
+    changed. The joined file is content-addressed: if another lesson already uses
+    audio for the same blocks and voice, its file is shared. Failed attempts are
+    retried with a growing delay; only the audio columns of the lesson are written,
+    so a failure never affects the lesson itself.
+    """
+    db = SessionLocal()
+    try:
+        # An edit while rendering puts the lesson back to `pending` but cannot queue
+        # another render here (this one is still in flight), so this one starts over
+        while True:
+            if not claim_render(db, lesson_id):
+                return
+            lesson = db.query(Lesson.content).filter(Lesson.lesson_id == lesson_id).first()
+            if lesson is None:
+                return
+
+            blocks = extract_text_blocks(lesson.content or [])
+            if not blocks:
+                detach_audio(db, lesson_id)
+                return
+
+            content_hash = lesson_audio_hash(blocks, DEFAULT_VOICE)
+            audio_path = audio_assets_repository.get_existing_path(db, content_hash)
+            # Do not hold a read transaction open while synthesizing
+            db.rollback()
+
+            if audio_path is None:
+                audio_path = synthesize_audio(lesson_id, blocks, content_hash)
+                if audio_path is None:
+                    fail_render(db, lesson_id)
+                    return
+
+            block_hashes = [audio_content_hash(block, DEFAULT_VOICE) for block in blocks]
+            if attach_audio(db, lesson_id, content_hash, audio_path, block_hashes):
+                return
+    finally:
+        db.close()
+
+
+def _claimable(now: datetime):
+    # Pending, or claimed by a render that has not finished in time (its process died)
+    return or_(
+        Lesson.audio_status == "pending",
+        Lesson.audio_render_started_at < now - timedelta(seconds=AUDIO_RENDER_TIMEOUT_SECONDS),
+    )
+
+
+def claim_render(db, lesson_id: int) -> bool:
+    """
+    Move the lesson to `rendering` in one conditional UPDATE. Returns False if it
+    has nothing to render or another render holds a live claim on it.
+    """
+    now = datetime.utcnow()
+    user_id = db.execute(
+        update(Lesson)
+        .where(
+            Lesson.lesson_id == lesson_id,
+            Lesson.audio_status.in_(("pending", "rendering")),
+            _claimable(now),
+        )
+        .values(audio_status="rendering", audio_render_started_at=now)
+        .returning(Lesson.user_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if user_id is not None:
+        response_cache.bump(db, user_scope(user_id))
+    db.commit()
+    return user_id is not None
+
+
+def synthesize_audio(lesson_id: int, blocks: list[str], content_hash: str) -> Optional[str]:
+    """
+    Synthesize `blocks` into the content-addressed file for `content_hash`, retrying on failure.
+    Blocks rendered by an earlier attempt are reused. Returns None once every attempt has failed.
+    """
+    final_path = AUDIO_DIR / audio_filename_for_hash(content_hash)
+    for attempt in range(1, AUDIO_MAX_ATTEMPTS + 1):
+        try:
+            parts = asyncio.run(
+                synthesize_blocks(blocks, DEFAULT_VOICE, AUDIO_BLOCK_CONCURRENCY)
+            )
+            return str(concatenate_audio(parts, final_path))
+        except Exception as e:
+            logger.warning(
+                f"Audio for lesson {lesson_id} failed (attempt {attempt}/{AUDIO_MAX_ATTEMPTS}): {str(e)}"
+            )
+            if attempt < AUDIO_MAX_ATTEMPTS:
+                time.sleep(AUDIO_RETRY_DELAY_SECONDS * 2 ** (attempt - 1))
+    return None
+
+
+def attach_audio(db, lesson_id: int, content_hash: str, audio_path: str, block_hashes: list[str]) -> bool:
+    """
+    Point the lesson at the audio for `content_hash`, moving its reference off any previous audio.
+    Returns False, attaching nothing, if the lesson was edited while rendering and needs another render.
+    """
+    for _ in range(2):
+        lesson = db.get(Lesson, lesson_id)
+        current = (
+            lesson is not None
+            and lesson.audio_status == "rendering"
+            and lesson_audio_hash(extract_text_blocks(lesson.content or []), DEFAULT_VOICE) == content_hash
+        )
+        if not current:
+            # Deleted, edited or taken over by another render; drop the file if nothing else claimed it
+            render_again = lesson is not None and lesson.audio_status == "pending"
+            if audio_assets_repository.get_existing_path(db, content_hash) is None:
+                delete_audio_file(audio_path)
+            db.rollback()
+            return not render_again
+
+        released = []
+        try:
+            if lesson.audio_hash != content_hash:
+                audio_assets_repository.add_reference(db, content_hash, audio_path, block_hashes)
+                released = audio_assets_repository.remove_reference(db, lesson.audio_hash)
+            lesson.audio_hash = content_hash
+            lesson.audio_file_path = audio_path
+            lesson.audio_status = "ready"
+            lesson.audio_render_started_at = None
+            response_cache.bump(db, user_scope(lesson.user_id))
+            db.commit()
+        except IntegrityError:
+            # Another worker registered the same audio first; count our reference on its row
+            db.rollback()
+            continue
+        audio_locations.invalidate(lesson_id)
+        for path in released:
+            delete_audio_file(path)
+        return True
+    return True
+
+
+def detach_audio(db, lesson_id: int):
+    """
+    Clear the audio of a lesson that no longer has any text.
+    """
+    lesson = db.get(Lesson, lesson_id)
+    if lesson is None:
+        return
+    released = audio_assets_repository.remove_reference(db, lesson.audio_hash)
+    lesson.audio_hash = None
+    lesson.audio_file_path = None
+    lesson.audio_status = None
+    lesson.audio_render_started_at = None
+    response_cache.bump(db, user_scope(lesson.user_id))
+    db.commit()
+    audio_locations.invalidate(lesson_id)
+    for path in released:
+        delete_audio_file(path)
+
+
+def fail_render(db, lesson_id: int):
+    """Mark the lesson's audio as failed, unless an edit has queued a new render meanwhile."""
+    user_id = db.execute(
+        update(Lesson)
+        .where(Lesson.lesson_id == lesson_id, Lesson.audio_status == "rendering")
+        .values(audio_status="failed", audio_render_started_at=None)
+        .returning(Lesson.user_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if user_id is not None:
+        response_cache.bump(db, user_scope(user_id))
+    db.commit()
+
+
+def purge_orphan_audio_blocks(min_age_seconds: float = AUDIO_ORPHAN_BLOCK_AGE_SECONDS) -> int:
+    """
+    Delete cached block files that no lesson audio was joined from (left by failed
+    renders or by text edited while rendering) and leftover partial files.
+    Only files untouched for `min_age_seconds` are removed, so renders in progress
+    or waiting for a retry keep their blocks. Returns how many files were deleted.
+    """
+    if not BLOCK_DIR.exists():
+        return 0
+    cutoff = time.time() - min_age_seconds
+    candidates = {}  # block hash -> path
+    deleted = 0
+    for path in BLOCK_DIR.iterdir():
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        if path.suffix == ".part":
+            delete_audio_file(str(path))
+            deleted += 1
+        elif path.suffix == ".mp3":
+            candidates[path.stem] = path
+
+    db = SessionLocal()
+    try:
+        block_hashes = list(candidates)
+        for start in range(0, len(block_hashes), 500):
+            chunk = block_hashes[start:start + 500]
+            tracked = audio_assets_repository.get_tracked_blocks(db, chunk)
+            for block_hash in chunk:
+                if block_hash not in tracked:
+                    delete_audio_file(str(candidates[block_hash]))
+                    deleted += 1
+    finally:
+        db.close()
+    return deleted
+
+
+def resume_audio_renders() -> int:
+    """
+    Re-schedule pending renders, and renders whose claim has timed out because the
+    process running them stopped. Safe to run from every worker process: each render
+    is claimed before it starts, so a lesson is rendered once.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Lesson.lesson_id)
+            .filter(Lesson.audio_status.in_(("pending", "rendering")), _claimable(datetime.utcnow()))
+            .all()
+        )
+    finally:
+        db.close()
+    return audio_workers.resume(row.lesson_id for row in rows)
+
+
+audio_workers = JobWorkerPool(render_lesson_audio, max_workers=AUDIO_WORKERS, name="audio")
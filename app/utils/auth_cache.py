@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import TOKEN_CACHE_SIZE, USER_PROFILE_CACHE_SIZE, USER_PROFILE_CACHE_TTL_SECONDS
+
+
+class VerifiedTokenCache:
+    """
+    LRU of JWTs whose signature has already been checked, keyed by a hash of the
+    token so raw tokens are not kept in memory. An entry is dropped at the
+    token's `exp`, so an expired token is always re-verified (and rejected).
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._tokens = OrderedDict()  # token hash -> (user_id, exp)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[int]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            user_id, exp = entry
+            if exp <= time.time():
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return user_id
+
+    def set(self, token: str, user_id: int, exp: float):
+        key = self._key(token)
+        with self._lock:
+            self._tokens[key] = (user_id, exp)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+
+class UserProfileCache:
+    """
+    Short-lived cache of user profiles by ID. Entries expire after `ttl_seconds`
+    and are invalidated as soon as this process updates or deletes the user.
+    """
+
+    def __init__(self, ttl_seconds: float = USER_PROFILE_CACHE_TTL_SECONDS, max_entries: int = USER_PROFILE_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()  # user_id -> (expires_at, profile)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._profiles.get(user_id)
+            if entry is None:
+                return None
+            expires_at, profile = entry
+            if expires_at <= time.monotonic():
+                del self._profiles[user_id]
+                return None
+            self._profiles.move_to_end(user_id)
+            return profile
+
+    def set(self, user_id: int, profile):
+        with self._lock:
+            self._profiles[user_id] = (time.monotonic() + self.ttl_seconds, profile)
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._profiles.pop(user_id, None)
+
+
+verified_tokens = VerifiedTokenCache()
+user_profiles = UserProfileCache()
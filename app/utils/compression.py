@@ -0,0 +1,50 @@
+import gzip
+from typing import Optional
+
+import brotli
+
+from ..config import RESPONSE_COMPRESSION_MIN_SIZE
+
+# Compressed variants are built once per cached response, so these favour size over speed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+
+# Preferred first when the client accepts several with the same weight
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def negotiate_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """
+    The content coding to send a body of `size` bytes with, given the request's
+    `Accept-Encoding`, or None to send it as is. Small bodies are never compressed.
+    """
+    if not accept_encoding or size < RESPONSE_COMPRESSION_MIN_SIZE:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0 makes the same body compress to the same bytes in every process
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding: {encoding}")
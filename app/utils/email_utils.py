@@ -1,41 +1,224 @@
-from app.config import MAIL_PASSWORD, MAIL_USERNAME
-from fastapi import HTTPException
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+import asyncio
+import logging
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Optional
+
+import aiosmtplib
 from pydantic import EmailStr
-from starlette.responses import JSONResponse
-
-
-# Email configuration
-conf = ConnectionConfig(
-    MAIL_USERNAME = MAIL_USERNAME,
-    MAIL_PASSWORD = MAIL_PASSWORD,
-    MAIL_FROM = MAIL_USERNAME,
-    MAIL_PORT = 587,
-    MAIL_SERVER = "smtp.gmail.com",
-    MAIL_FROM_NAME="Basalt",
-    MAIL_STARTTLS = True,
-    MAIL_SSL_TLS = False,
-    USE_CREDENTIALS = True,
-    VALIDATE_CERTS = True
+
+from app.config import (
+    MAIL_PASSWORD,
+    MAIL_USERNAME,
+    MAIL_SERVER,
+    MAIL_PORT,
+    MAIL_STARTTLS,
+    MAIL_FROM_NAME,
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_RETRY_DELAY_SECONDS,
+    EMAIL_IDLE_TIMEOUT_SECONDS,
 )
 
-async def send_email(recipient: EmailStr, subject: str, body: str) -> JSONResponse:
-    html = f"""<p>{body}</p> """
-
-    # Create the message object
-    message = MessageSchema(
-        subject=subject,
-        recipients=[recipient],
-        body=html,
-        subtype=MessageType.html
-    )
-    
-    fm = FastMail(conf)
-    
-    try:
-        # Send email
-        await fm.send_message(message)
-        return JSONResponse(status_code=200, content={"message": "Email has been sent successfully"})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error sending email: {str(e)}")
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    recipient: str
+    subject: str
+    body: str
+    attempts: int = 0
+
+
+class EmailOutbox:
+    """
+    In-memory outbox drained by one long-lived worker task.
+
+    The worker keeps a single SMTP connection open while there is mail to send
+    and sends up to `batch_size` queued messages over it at a time, so a burst of
+    registrations costs one TLS handshake instead of one per message. The
+    connection is closed after `idle_timeout` seconds without mail. A failed
+    message is re-queued with exponential backoff until `max_attempts` is
+    reached, then logged and dropped; permanent (5xx) rejections, refused
+    recipients and messages that cannot be built are dropped straight away. An
+    unexpected error fails one message, never the worker. Messages still queued when the process
+    stops are lost; verification codes expire long before a restart matters.
+    """
+
+    def __init__(
+        self,
+        hostname: str = MAIL_SERVER,
+        port: int = MAIL_PORT,
+        username: Optional[str] = MAIL_USERNAME,
+        password: Optional[str] = MAIL_PASSWORD,
+        start_tls: bool = MAIL_STARTTLS,
+        sender: Optional[str] = MAIL_USERNAME,
+        sender_name: str = MAIL_FROM_NAME,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_delay: float = EMAIL_RETRY_DELAY_SECONDS,
+        idle_timeout: float = EMAIL_IDLE_TIMEOUT_SECONDS,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.sender = formataddr((sender_name, sender or ""))
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+
+        self._queue = None
+        self._worker = None
+        self._smtp = None
+        self._retries = set()
+        self._counters = {"sent": 0, "failed": 0, "retried": 0, "connections": 0}
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self._disconnect()
+
+    def enqueue(self, recipient: EmailStr, subject: str, body: str):
+        """Queue an email; it is sent by the outbox worker."""
+        self.start()
+        self._queue.put_nowait(OutgoingEmail(recipient, subject, body))
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retrying": len(self._retries),
+            "connected": self._smtp is not None and self._smtp.is_connected,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                email = await asyncio.wait_for(self._queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                await self._disconnect()
+                continue
+
+            batch = [email]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._send_batch(batch)
+            except Exception:
+                # _send_batch handles every message's errors; never let a bug stop the worker
+                logger.exception("Email outbox worker failed on a batch")
+
+    async def _send_batch(self, batch: list[OutgoingEmail]):
+        for index, email in enumerate(batch):
+            try:
+                message = self._build_message(email)
+            except Exception as e:
+                # A malformed address or header cannot be fixed by sending it again
+                self._give_up(email, e)
+                continue
+            try:
+                smtp = await self._connection()
+                await smtp.send_message(message)
+                self._counters["sent"] += 1
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, OSError) as e:
+                # The connection is gone; everything left in the batch goes back through retry
+                await self._disconnect()
+                for pending in batch[index:]:
+                    self._retry(pending, e)
+                return
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                # Every recipient was rejected; sending again gets the same answer
+                self._give_up(email, e)
+            except aiosmtplib.SMTPResponseException as e:
+                # 5xx replies (bad recipient, rejected content) will not succeed on a retry
+                if e.code >= 500:
+                    self._give_up(email, e)
+                else:
+                    self._retry(email, e)
+            except aiosmtplib.SMTPException as e:
+                self._retry(email, e)
+            except Exception as e:
+                # Unexpected; the connection may be in any state, so start over on a new one
+                await self._disconnect()
+                self._retry(email, e)
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.hostname,
+                port=self.port,
+                username=self.username or None,
+                password=self.password or None,
+                start_tls=self.start_tls,
+            )
+            try:
+                await smtp.connect()
+            except aiosmtplib.SMTPException:
+                # Connected but the handshake or login failed
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._counters["connections"] += 1
+        return self._smtp
+
+    async def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception as e:
+                # The server hung up or timed out first; drop the connection either way
+                logger.warning(f"Failed to close the SMTP connection cleanly: {str(e)}")
+                smtp.close()
+
+    def _retry(self, email: OutgoingEmail, error: Exception):
+        email.attempts += 1
+        if email.attempts >= self.max_attempts:
+            self._give_up(email, error)
+            return
+        delay = self.retry_delay * 2 ** (email.attempts - 1)
+        logger.warning(
+            f"Email to {email.recipient} failed (attempt {email.attempts}/{self.max_attempts}), retrying in {delay}s: {str(error)}"
+        )
+        self._counters["retried"] += 1
+
+        def requeue():
+            self._retries.discard(handle)
+            self._queue.put_nowait(email)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retries.add(handle)
+
+    def _give_up(self, email: OutgoingEmail, error: Exception):
+        self._counters["failed"] += 1
+        logger.error(f"Giving up on email to {email.recipient}: {str(error)}")
+
+    def _build_message(self, email: OutgoingEmail) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = email.recipient
+        message["Subject"] = email.subject
+        message.set_content(email.body)
+        message.add_alternative(f"<p>{email.body}</p>", subtype="html")
+        return message
+
 
+email_outbox = EmailOutbox()
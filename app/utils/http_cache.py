@@ -0,0 +1,71 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.responses import FileResponse
+
+
+def etag_matches(header_value: Optional[str], etag: str) -> bool:
+    """
+    Whether an `If-None-Match` header matches `etag`, using weak comparison as RFC 9110 requires.
+    """
+    if not header_value:
+        return False
+    if header_value.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header_value.split(",")
+    )
+
+
+class FileETags:
+    """
+    Strong ETags computed from file content, remembered per (path, mtime, size)
+    so each file is hashed once rather than on every request.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._etags = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stat_result: os.stat_result) -> str:
+        key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            etag = self._etags.get(key)
+            if etag is not None:
+                self._etags.move_to_end(key)
+                return etag
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > self.max_entries:
+                self._etags.popitem(last=False)
+        return etag
+
+
+class ETagFileResponse(FileResponse):
+    """
+    FileResponse that honours `If-Range` against the ETag it was given instead of
+    Starlette's mtime-based one. Byte ranges (206 / 416) are handled by FileResponse.
+    """
+
+    def __init__(self, path: str, etag: str, stat_result: os.stat_result, **kwargs):
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["etag"] = etag
+        super().__init__(path, headers=headers, stat_result=stat_result, **kwargs)
+        self.etag = etag
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        # If-Range requires a strong comparison
+        return http_if_range == self.etag or super()._should_use_range(http_if_range, stat_result)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """
+    Runs persisted jobs on a bounded thread pool.
+
+    The pool only carries job IDs; the job itself lives in the database, so
+    anything still queued when the process stops is picked up again by
+    `resume` on the next startup.
+
+    Args:
+        run_job (Callable[[int], None]): Processes a single job by ID.
+        max_workers (int): Number of jobs processed concurrently.
+        name (str): Prefix for the worker thread names.
+    """
+
+    def __init__(self, run_job: Callable[[int], None], max_workers: int = 4, name: str = "jobs"):
+        self._run_job = run_job
+        self._max_workers = max_workers
+        self._name = name
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix=self._name
+                )
+            return self._executor
+
+    def submit(self, job_id: int) -> bool:
+        """
+        Schedule a job. Returns False if the job is already scheduled in this process.
+        """
+        with self._lock:
+            if job_id in self._in_flight:
+                return False
+            self._in_flight.add(job_id)
+        self._get_executor().submit(self._run, job_id)
+        return True
+
+    def resume(self, job_ids: Iterable[int]) -> int:
+        """
+        Schedule every job in `job_ids`, returning how many were newly scheduled.
+        """
+        return sum(1 for job_id in job_ids if self.submit(job_id))
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _run(self, job_id: int):
+        try:
+            self._run_job(job_id)
+        except Exception:
+            logger.exception(f"{self._name}: job {job_id} crashed")
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+
+
+def worker_id() -> str:
+    """Identifies this process as the owner of the jobs it runs."""
+    # Read on every call, so a forked worker does not inherit its parent's ID
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Heartbeat:
+    """
+    Calls `beat` every `interval` seconds from a daemon thread while the `with`
+    block runs, e.g. to renew the lease of a job that takes a while.
+    """
+
+    def __init__(self, beat: Callable[[], None], interval: float):
+        self._beat = beat
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            try:
+                self._beat()
+            except Exception as e:
+                logger.warning(f"Heartbeat failed: {str(e)}")
+
+
+async def resume_periodically(resume: Callable[[], int], interval_seconds: float, name: str):
+    """
+    Run `resume` (which schedules recoverable jobs and returns how many) in a thread
+    every `interval_seconds` until cancelled, so jobs abandoned by a worker process
+    that died are picked up while the others keep running.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            resumed = await asyncio.to_thread(resume)
+            if resumed:
+                logger.info(f"{name}: resumed {resumed} job(s)")
+        except Exception as e:
+            logger.warning(f"{name}: failed to resume jobs: {str(e)}")
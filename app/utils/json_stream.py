@@ -0,0 +1,125 @@
+import json
+from typing import Iterable, Optional
+
+WHITESPACE = " \t\r\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "key", "index", "expect_key")
+
+    def __init__(self, kind: str, path: tuple, start: int):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        self.key = None
+        self.index = 0
+        self.expect_key = kind == "{"
+
+
+class IncrementalJSONParser:
+    """
+    Parses a single JSON document that arrives in chunks (e.g. a streamed completion).
+
+    `feed` returns every value that became complete with that chunk as a
+    `(path, value)` pair, where `path` is a tuple of object keys and array
+    indexes from the document root. Only values whose path matches one of the
+    `watch` patterns are decoded; `"*"` in a pattern matches any array index.
+    Anything before the first `{` or `[` (such as a stray Markdown fence) is skipped.
+
+    Args:
+        watch (Iterable[tuple]): Path patterns to decode and return.
+    """
+
+    def __init__(self, watch: Iterable[tuple]):
+        self._watch = [tuple(pattern) for pattern in watch]
+        self._text = ""
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        self._started = False
+        self.done = False
+
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._scalar_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> list[tuple]:
+        self._text += chunk
+        completed = []
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._stack[-1].key = json.loads(text[self._string_start:i + 1])
+                    else:
+                        self._complete(self._value_path(), self._string_start, i + 1, completed)
+                continue
+
+            if self._scalar_start is not None:
+                if c not in ",]}" and c not in WHITESPACE:
+                    continue
+                self._complete(self._value_path(), self._scalar_start, i, completed)
+                self._scalar_start = None
+
+            if self.done:
+                break
+
+            if not self._started:
+                if c not in "{[":
+                    continue
+                self._started = True
+
+            if c in "{[":
+                self._stack.append(_Frame(c, self._value_path(), i))
+            elif c in "}]":
+                frame = self._stack.pop()
+                self._complete(frame.path, frame.start, i + 1, completed)
+                if not self._stack:
+                    self.done = True
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+                frame = self._stack[-1]
+                self._string_is_key = frame.kind == "{" and frame.expect_key
+            elif c == ":":
+                self._stack[-1].expect_key = False
+            elif c == ",":
+                frame = self._stack[-1]
+                if frame.kind == "{":
+                    frame.expect_key = True
+                else:
+                    frame.index += 1
+            elif c not in WHITESPACE:
+                self._scalar_start = i
+
+        self._pos = len(text)
+        return completed
+
+    def _value_path(self) -> tuple:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        return frame.path + ((frame.key if frame.kind == "{" else frame.index),)
+
+    def _complete(self, path: tuple, start: int, end: int, completed: list):
+        if any(self._matches(pattern, path) for pattern in self._watch):
+            completed.append((path, json.loads(self._text[start:end])))
+
+    @staticmethod
+    def _matches(pattern: tuple, path: tuple) -> bool:
+        if len(pattern) != len(path):
+            return False
+        return all(
+            expected == actual or (expected == "*" and isinstance(actual, int))
+            for expected, actual in zip(pattern, path)
+        )
@@ -0,0 +1,24 @@
+import asyncio
+import logging
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+
+def _ping(url: str, timeout: float) -> int:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status
+
+
+async def ping_forever(url: str, interval: float, timeout: float = 30):
+    """
+    Request `url` every `interval` seconds so an idle free-tier host is not put to sleep.
+    Runs as a task of the application's lifespan; cancel it to stop.
+    """
+    while True:
+        try:
+            status = await asyncio.to_thread(_ping, url, timeout)
+            logger.info(f"Ping status: {status}")
+        except Exception as e:
+            logger.warning(f"Failed to ping the server: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def normalize_text(value: str) -> str:
+    """Case-fold and collapse whitespace so trivially different prompts share an entry."""
+    return " ".join(value.split()).casefold()
+
+
+def make_cache_key(learning_field: str, description: str, model: str, prompt_version: int) -> str:
+    raw = json.dumps(
+        [normalize_text(learning_field), normalize_text(description), model, prompt_version]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LessonCache:
+    """
+    Two-tier cache for generated lesson JSON.
+
+    Entries live in an in-memory LRU in front of a SQLite file, so they
+    survive restarts and are shared by every worker on the host. Both tiers
+    expire entries after `ttl_seconds`; the memory tier keeps at most
+    `memory_size` entries and the disk tier at most `disk_size`, dropping
+    the least recently used ones first.
+    """
+
+    def __init__(self, path: str, memory_size: int = 256, disk_size: int = 5000, ttl_seconds: int = 604800):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS lesson_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_lesson_cache_used_at ON lesson_cache (used_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, stored_at FROM lesson_cache WHERE key = ? AND stored_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            value, stored_at = row
+            conn.execute("UPDATE lesson_cache SET used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._remember(key, stored_at, value)
+            self._counters["disk_hits"] += 1
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO lesson_cache (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict_disk(conn, now)
+            conn.commit()
+            self._counters["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            conn.execute("DELETE FROM lesson_cache")
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._connection().execute("SELECT COUNT(*) FROM lesson_cache").fetchone()[0],
+            }
+
+    def _remember(self, key: str, stored_at: float, value: str):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM lesson_cache WHERE stored_at <= ?", (now - self.ttl_seconds,))
+        conn.execute(
+            """
+            DELETE FROM lesson_cache WHERE key IN (
+                SELECT key FROM lesson_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.disk_size,),
+        )
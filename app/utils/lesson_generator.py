@@ -1,7 +1,29 @@
-from ..config import client
+import asyncio
+import json
+from typing import Iterator
 
+from ..config import (
+    LESSON_CACHE_PATH,
+    LESSON_CACHE_TTL_SECONDS,
+    LESSON_CACHE_MEMORY_SIZE,
+    LESSON_CACHE_DISK_SIZE,
+)
+from .lesson_cache import LessonCache, make_cache_key
+from .openai_clients import openai_clients
 
-def create_lesson(thing_to_learn, description):
+LESSON_MODEL = "gpt-4o"
+# Bump whenever the prompt below changes so cached lessons from the old prompt are not reused
+PROMPT_VERSION = 1
+
+lesson_cache = LessonCache(
+    LESSON_CACHE_PATH,
+    memory_size=LESSON_CACHE_MEMORY_SIZE,
+    disk_size=LESSON_CACHE_DISK_SIZE,
+    ttl_seconds=LESSON_CACHE_TTL_SECONDS,
+)
+
+
+def build_lesson_messages(thing_to_learn, description) -> list[dict]:
     prompt = f"""
         You are an assistant that generates structured JSON responses for creating educational content. 
         The content should be focused on "{thing_to_learn}" with the following description: "{description}".
@@ -59,14 +81,117 @@ def create_lesson(thing_to_learn, description):
         Please generate a fully detailed JSON response according to the given specifications. Only return the JSON response. Do not include any additional text. Do not include any tags like json before JSON itself PURE JSON.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an assistant that provides JSON responses.",
-            },
-            {"role": "user", "content": prompt},
-        ],
+    return [
+        {
+            "role": "system",
+            "content": "You are an assistant that provides JSON responses.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+def lesson_cache_key(thing_to_learn, description) -> str:
+    return make_cache_key(thing_to_learn, description, LESSON_MODEL, PROMPT_VERSION)
+
+
+def cache_lesson(key: str, lesson_json: str):
+    """Store a completion, skipping anything that is not valid JSON."""
+    try:
+        json.loads(lesson_json)
+    except (TypeError, json.JSONDecodeError):
+        return
+    lesson_cache.set(key, lesson_json)
+
+
+def create_lesson(thing_to_learn, description):
+    key = lesson_cache_key(thing_to_learn, description)
+    cached = lesson_cache.get(key)
+    if cached is not None:
+        return cached
+
+    response = openai_clients.get().chat.completions.create(
+        model=LESSON_MODEL,
+        messages=build_lesson_messages(thing_to_learn, description),
+    )
+    lesson_json = response.choices[0].message.content
+    cache_lesson(key, lesson_json)
+    return lesson_json
+
+
+def stream_lesson(thing_to_learn, description) -> Iterator[str]:
+    """
+    Same completion as `create_lesson`, yielded as text fragments while the model produces them.
+    A cached lesson is yielded in one piece.
+    """
+    key = lesson_cache_key(thing_to_learn, description)
+    cached = lesson_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    stream = openai_clients.get().chat.completions.create(
+        model=LESSON_MODEL,
+        messages=build_lesson_messages(thing_to_learn, description),
+        stream=True,
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield parts[-1]
+    cache_lesson(key, "".join(parts))
+
+
+def build_outline_messages(thing_to_learn, description, lesson_count) -> list[dict]:
+    prompt = f"""
+        You are an assistant that plans courses for an educational platform.
+        Plan a course focused on "{thing_to_learn}" with the following description: "{description}".
+
+        Split the course into exactly {lesson_count} lessons that build on each other, from the basics to more advanced topics.
+        Each lesson should cover a different topic.
+
+        Return a JSON object with a single field `lessons`, a list of lesson objects in the order they should be studied:
+        - `title`: The title of the lesson. Make it short (2-3 words). Don't use the word "Lesson".
+        - `description`: One or two sentences on what the lesson covers.
+
+        Only return the JSON response. Do not include any additional text. Do not include any tags like json before JSON itself PURE JSON.
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "You are an assistant that provides JSON responses.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def acreate_outline(thing_to_learn, description, lesson_count) -> list[dict]:
+    """
+    Ask the model for an ordered list of `lesson_count` lesson topics.
+    """
+    response = await openai_clients.get_async().chat.completions.create(
+        model=LESSON_MODEL,
+        messages=build_outline_messages(thing_to_learn, description, lesson_count),
+    )
+    outline = json.loads(response.choices[0].message.content)
+    lessons = outline.get("lessons", []) if isinstance(outline, dict) else outline
+    return [lesson for lesson in lessons if isinstance(lesson, dict) and lesson.get("title")][:lesson_count]
+
+
+async def acreate_lesson(thing_to_learn, description):
+    """
+    Non-blocking counterpart of `create_lesson`, sharing its cache.
+    """
+    key = lesson_cache_key(thing_to_learn, description)
+    cached = await asyncio.to_thread(lesson_cache.get, key)
+    if cached is not None:
+        return cached
+
+    response = await openai_clients.get_async().chat.completions.create(
+        model=LESSON_MODEL,
+        messages=build_lesson_messages(thing_to_learn, description),
     )
-    return response.choices[0].message.content
\ No newline at end of file
+    lesson_json = response.choices[0].message.content
+    await asyncio.to_thread(cache_lesson, key, lesson_json)
+    return lesson_json
@@ -0,0 +1,25 @@
+import orjson
+
+
+def _lesson_document(row) -> dict:
+    # Same fields, in the same order, as LessonResponse
+    return {
+        "title": row.title,
+        "description": row.description,
+        "position": row.position,
+        # The stored JSON text goes into the output as is; it is never parsed
+        "content": orjson.Fragment(row.content_json) if row.content_json is not None else None,
+        "lesson_id": row.lesson_id,
+        "user_id": row.user_id,
+        "audio_status": row.audio_status,
+    }
+
+
+def lesson_json(row) -> bytes:
+    """A `LessonResponse` body built straight from a row of `LESSON_PAYLOAD_COLUMNS`."""
+    return orjson.dumps(_lesson_document(row))
+
+
+def lessons_json(rows) -> bytes:
+    """A `list[LessonResponse]` body built straight from rows of `LESSON_PAYLOAD_COLUMNS`."""
+    return orjson.dumps([_lesson_document(row) for row in rows])
@@ -0,0 +1,88 @@
+from typing import AsyncIterable, AsyncIterator
+
+import orjson
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+
+from ..config import LESSON_IMPORT_MAX_LINE_BYTES
+from ..schemas.lessons import LessonTreeCreate
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_lesson_tree = TypeAdapter(LessonTreeCreate)
+
+
+def lesson_tree_line(lesson, quiz, questions) -> bytes:
+    """
+    One exported lesson as an NDJSON line in the `LessonTreeCreate` format, so the
+    export of one user can be imported as is. `lesson` is a row of
+    `LESSON_PAYLOAD_COLUMNS`; its stored content JSON is copied without parsing.
+    """
+    document = {
+        "title": lesson.title,
+        "description": lesson.description,
+        "position": lesson.position,
+        "content": orjson.Fragment(lesson.content_json) if lesson.content_json is not None else None,
+        "quiz": None,
+    }
+    if quiz is not None:
+        document["quiz"] = {
+            "title": quiz.title,
+            "description": quiz.description,
+            "questions": [
+                {
+                    "question_text": question.question_text,
+                    "question_type": question.question_type,
+                    "options": question.options,
+                    "correct_answer": question.correct_answer,
+                }
+                for question in questions
+            ],
+        }
+    return orjson.dumps(document, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def _line_too_long(line_number: int, max_line_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Line {line_number} is longer than {max_line_bytes} bytes")
+
+
+async def _lines(chunks: AsyncIterable[bytes], max_line_bytes: int) -> AsyncIterator[tuple[int, bytes]]:
+    """Split a byte stream into (line number, line), holding at most one line in memory."""
+    # Pieces of the line being read, joined once the line is complete
+    pieces = []
+    size = 0
+    line_number = 0
+    async for chunk in chunks:
+        *ends, rest = chunk.split(b"\n")
+        for end in ends:
+            line_number += 1
+            if size + len(end) > max_line_bytes:
+                raise _line_too_long(line_number, max_line_bytes)
+            pieces.append(end)
+            yield line_number, b"".join(pieces)
+            pieces, size = [], 0
+        pieces.append(rest)
+        size += len(rest)
+        if size > max_line_bytes:
+            raise _line_too_long(line_number + 1, max_line_bytes)
+    if size:
+        yield line_number + 1, b"".join(pieces)
+
+
+async def parse_lesson_trees(
+    chunks: AsyncIterable[bytes], max_line_bytes: int = LESSON_IMPORT_MAX_LINE_BYTES
+) -> AsyncIterator[LessonTreeCreate]:
+    """
+    Validate an NDJSON stream of `LessonTreeCreate` documents as it arrives.
+    Blank lines are skipped; an invalid line raises a 400 naming it.
+    """
+    async for line_number, line in _lines(chunks, max_line_bytes):
+        if not line.strip():
+            continue
+        try:
+            yield _lesson_tree.validate_json(line)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid lesson on line {line_number}: {e.errors(include_url=False, include_input=False)}",
+            )
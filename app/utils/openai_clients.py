@@ -0,0 +1,49 @@
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from ..config import OPENAI_API_KEY
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+
+class OpenAIClients:
+    """
+    The sync and async OpenAI clients, created on first use. Importing the app
+    does not load the SDK, and each worker process builds its own clients (and
+    connection pools) after it has been forked.
+    """
+
+    def __init__(self, api_key: Optional[str] = OPENAI_API_KEY):
+        self.api_key = api_key
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def get(self) -> "OpenAI":
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+
+                self._client = OpenAI(api_key=self.api_key)
+            return self._client
+
+    def get_async(self) -> "AsyncOpenAI":
+        with self._lock:
+            if self._async_client is None:
+                from openai import AsyncOpenAI
+
+                self._async_client = AsyncOpenAI(api_key=self.api_key)
+            return self._async_client
+
+    async def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+            async_client, self._async_client = self._async_client, None
+        if client is not None:
+            client.close()
+        if async_client is not None:
+            await async_client.close()
+
+
+openai_clients = OpenAIClients()
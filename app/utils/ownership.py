@@ -0,0 +1,55 @@
+from fastapi import Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.base import get_async_db
+from ..database.models import Lesson, Quiz, Question
+from .security import ensure_user_owns_resource, get_current_user_id
+
+# Dependencies that load a resource together with the user_id of the lesson
+# that owns it in one joined query, and reject the request unless the current
+# user owns it. The entity stays in the request's session, so handlers and
+# repositories can act on it without fetching it again.
+
+
+async def get_owned_lesson(
+    lesson_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+) -> Lesson:
+    lesson = await db.get(Lesson, lesson_id)
+    if not lesson:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    ensure_user_owns_resource(lesson.user_id, user_id)
+    return lesson
+
+
+async def get_owned_quiz(
+    quiz_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+) -> Quiz:
+    row = (
+        await db.execute(
+            select(Quiz, Lesson.user_id)
+            .join(Lesson, Quiz.lesson_id == Lesson.lesson_id)
+            .where(Quiz.quiz_id == quiz_id)
+        )
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    ensure_user_owns_resource(row.user_id, user_id)
+    return row.Quiz
+
+
+async def get_owned_question(
+    question_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+) -> Question:
+    row = (
+        await db.execute(
+            select(Question, Lesson.user_id)
+            .join(Quiz, Question.quiz_id == Quiz.quiz_id)
+            .join(Lesson, Quiz.lesson_id == Lesson.lesson_id)
+            .where(Question.question_id == question_id)
+        )
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Question not found")
+    ensure_user_owns_resource(row.user_id, user_id)
+    return row.Question
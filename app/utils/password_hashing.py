@@ -0,0 +1,111 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# This module is imported by the worker processes, so it must not import app settings.
+
+_contexts = {}
+
+
+def build_crypt_context(rounds: int) -> CryptContext:
+    # Hashes with a different cost than `rounds` report needs_update, which drives rehash-on-login
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _crypt_context(rounds: int) -> CryptContext:
+    if rounds not in _contexts:
+        _contexts[rounds] = build_crypt_context(rounds)
+    return _contexts[rounds]
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> tuple[bool, Optional[str]]:
+    return _crypt_context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small pool of worker processes, so hashing neither blocks
+    the event loop nor holds the GIL or threadpool slots other requests need.
+
+    At most `max_pending` operations may be queued or running; beyond that
+    callers get a 503 instead of piling up. The pool is started on first use.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_pending: int = 64):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Check `password` against `hashed_password`. The second value is a fresh hash
+        when the stored one used other cost parameters and should be replaced, else None.
+        """
+        return await self._run(_verify_and_update, password, hashed_password, self.rounds)
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many password operations in progress. Please retry.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            executor = self._get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next caller
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" keeps the workers free of the parent's threads and open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": min(self._pending, self.max_workers),
+                "queued": max(self._pending - self.max_workers, 0),
+                "max_pending": self.max_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,200 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS
+from ..database.models import ResponseVersion
+from .compression import compress, negotiate_encoding
+from .http_cache import etag_matches
+
+# Clients may keep responses but must revalidate them with the ETag before reuse
+RESPONSE_CACHE_CONTROL = "private, no-cache"
+
+
+def user_scope(user_id: int) -> str:
+    """The lessons of a user (the lesson listing)."""
+    return f"user:{user_id}"
+
+
+def lesson_scope(lesson_id: int) -> str:
+    """Which quiz belongs to a lesson."""
+    return f"lesson:{lesson_id}"
+
+
+def quiz_scope(quiz_id: int) -> str:
+    """A quiz and its questions."""
+    return f"quiz:{quiz_id}"
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "version", "expires_at", "_variants")
+
+    def __init__(self, body: bytes, version: int, expires_at: float):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.version = version
+        self.expires_at = expires_at
+        self._variants = {}  # content coding -> compressed body
+
+    def variant(self, encoding: Optional[str]) -> tuple[bytes, str]:
+        """
+        The body in `encoding` (None for the body as is) and its ETag. Each coding is
+        compressed the first time it is asked for and kept with the entry.
+        """
+        if encoding is None:
+            return self.body, self.etag
+        body = self._variants.get(encoding)
+        if body is None:
+            body = self._variants[encoding] = compress(self.body, encoding)
+        # Each representation gets its own strong ETag
+        return body, f'{self.etag[:-1]}-{encoding}"'
+
+    async def variant_async(self, encoding: Optional[str]) -> tuple[bytes, str]:
+        """`variant` that compresses in a worker thread, off the event loop."""
+        if encoding is not None and encoding not in self._variants:
+            await run_in_threadpool(self.variant, encoding)
+        return self.variant(encoding)
+
+
+class ResponseCache:
+    """
+    Serialized JSON responses keyed by resource and owner, each tied to the version
+    of the scope it was built from (see `user_scope`, `lesson_scope`, `quiz_scope`).
+
+    Versions are kept in the `response_versions` table, so all worker processes share
+    them. Repositories `bump` the scopes a write touches in the write's transaction,
+    which makes every response built from the old data stale in every process without
+    finding it. A request reads its scope's version (a primary key lookup) before it
+    loads the data, and a response is only cached after the owner check passed.
+    """
+
+    def __init__(self, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> CachedResponse
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "bumps": 0}
+
+    async def version(self, db: AsyncSession, scope: str) -> int:
+        """Read before loading the data of a response and pass to `get` and `set`."""
+        version = await db.scalar(select(ResponseVersion.version).where(ResponseVersion.scope == scope))
+        return version or 0
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry
+            if entry is not None and entry.version <= version:
+                del self._entries[key]
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: Hashable, version: int, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body, version, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            current = self._entries.get(key)
+            # A request that read the version before a write must not replace a newer entry
+            if current is None or current.version <= version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def bump(self, db: Session, *scopes: str):
+        """Make responses of `scopes` stale once the caller's transaction commits."""
+        db.execute(_bump_statement(db, scopes))
+        self._count_bumps(scopes)
+
+    async def bump_async(self, db: AsyncSession, *scopes: str):
+        """`bump` for an AsyncSession."""
+        await db.execute(_bump_statement(db, scopes))
+        self._count_bumps(scopes)
+
+    def _count_bumps(self, scopes):
+        with self._lock:
+            self._counters["bumps"] += len(scopes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
+
+
+def _bump_statement(db, scopes):
+    """Add one to the version of each of `scopes`, creating versions not stored yet."""
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    # Sorted, so concurrent writes lock the same rows in the same order
+    statement = dialect.insert(ResponseVersion).values(
+        [{"scope": scope, "version": 1} for scope in sorted(set(scopes))]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=["scope"], set_={"version": ResponseVersion.version + 1}
+    )
+
+
+response_cache = ResponseCache()
+
+_adapters = {}
+
+
+def _serialize(response_model, data) -> bytes:
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+async def cached_response(
+    request: Request,
+    db: AsyncSession,
+    key: Hashable,
+    scope: str,
+    load: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    Serve `key` from the response cache, or call `load` (which must also check
+    ownership) for the JSON body to cache. The body is compressed with the best
+    coding the client accepts, and a matching `If-None-Match` is answered with 304.
+    """
+    version = await response_cache.version(db, scope)
+    entry = response_cache.get(key, version)
+    if entry is None:
+        entry = response_cache.set(key, version, await load())
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), len(entry.body))
+    body, etag = await entry.variant_async(encoding)
+    headers = {"ETag": etag, "Cache-Control": RESPONSE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cached_json_response(
+    request: Request,
+    db: AsyncSession,
+    key: Hashable,
+    scope: str,
+    response_model,
+    load: Callable[[], Awaitable],
+) -> Response:
+    """`cached_response` for a `load` that returns data to serialize as `response_model`."""
+
+    async def load_body() -> bytes:
+        return _serialize(response_model, await load())
+
+    return await cached_response(request, db, key, scope, load_body)
@@ -3,30 +3,34 @@ from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, WebSocket
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database.base import get_db
+from ..database.base import get_async_db
 from ..database.models import User
-from ..repositories.users import UsersRepository
-from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..repositories.users import AsyncUsersRepository
+from ..schemas.users import UserInfo
+from ..config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+)
+from .auth_cache import verified_tokens, user_profiles
+from .password_hashing import PasswordHasher
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    rounds=BCRYPT_ROUNDS,
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+)
 
-users_repository = UsersRepository()
+async_users_repository = AsyncUsersRepository()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/users/login")
 
 
-def hash_password(password: str) -> str:
-    """Hash the user's password using bcrypt."""
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify the hashed password matches the plain password."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-
 def create_jwt_token(user_id: int) -> str:
     """Create a JWT token for the given user ID."""
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -36,17 +40,54 @@ def create_jwt_token(user_id: int) -> str:
 
 
 def decode_jwt_token(token: str) -> int:
-    """Decode the JWT token and extract the user ID."""
+    """
+    Decode the JWT token and extract the user ID.
+    Tokens already verified are answered from a cache until they expire.
+    """
+    user_id = verified_tokens.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise JWTError("Invalid token")
+        if payload.get("exp") is not None:
+            verified_tokens.set(token, user_id, payload["exp"])
         return user_id
     except JWTError as e:
         raise e
 
 
+def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """
+    Dependency resolving the ID of the user the bearer token belongs to.
+    """
+    try:
+        return decode_jwt_token(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def get_current_user(
+    user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_db)
+) -> UserInfo:
+    """
+    Dependency resolving the profile of the current user.
+    Profiles are cached briefly; updating or deleting the user invalidates the entry.
+    """
+    profile = user_profiles.get(user_id)
+    if profile is None:
+        user = await async_users_repository.get_user_by_id(db, user_id)
+        profile = UserInfo(id=user.user_id, fullname=user.fullname, email=user.email)
+        user_profiles.set(user_id, profile)
+    return profile
+
+
 def ensure_user_owns_resource(resource_user_id: int, user_id: int):
     """
     Ensure that the current user owns the resource.
@@ -1,14 +1,29 @@
 import asyncio
-import edge_tts
+import hashlib
+import json
 import os
+import shutil
+import uuid
+from importlib.metadata import version
 from typing import Optional
 from pathlib import Path
 
 VOICES = ["en-US-GuyNeural"]
 
+# Part of every audio content hash; a new engine version renders files under new names.
+# Read from the package metadata so edge-tts (and aiohttp) load only when audio is rendered
+TTS_ENGINE_VERSION = f"edge-tts/{version('edge-tts')}"
+
 # Directory to store audio files
 AUDIO_DIR = Path("audio_files")
-AUDIO_DIR.mkdir(exist_ok=True)
+
+# Per-content-block audio, reused whenever the same block is rendered again
+BLOCK_DIR = AUDIO_DIR / "blocks"
+
+
+def ensure_audio_dirs():
+    """Create the audio directories; called at startup and before audio is written."""
+    BLOCK_DIR.mkdir(parents=True, exist_ok=True)
 
 
 async def generate_audio(text: str, voice: str, filename: str) -> Path:
@@ -26,6 +41,9 @@ async def generate_audio(text: str, voice: str, filename: str) -> Path:
     if voice not in VOICES:
         raise ValueError(f"Voice '{voice}' is not supported.")
 
+    import edge_tts
+
+    ensure_audio_dirs()
     output_path = AUDIO_DIR / filename
     communicate = edge_tts.Communicate(text, voice)
     await communicate.save(str(output_path))
@@ -65,4 +83,121 @@ async def generate_and_save_audio(text: str, voice: str, filename: str) -> str:
     """
 
     audio_path = await generate_audio(text, voice, filename)
-    return audio_path
\ No newline at end of file
+    return audio_path
+
+
+def extract_text_blocks(content: list) -> list[str]:
+    """
+    Extracts the text of every 'text' content block, in order, skipping blank ones.
+
+    Args:
+        content (list): A list of dictionaries, each containing 'type' and 'value' keys.
+
+    Returns:
+        list[str]: One string per text block.
+    """
+    return [
+        item["value"]
+        for item in content
+        if isinstance(item, dict)
+        and item.get("type") == "text"
+        and isinstance(item.get("value"), str)
+        and item["value"].strip()
+    ]
+
+
+async def synthesize_blocks(blocks: list[str], voice: str, concurrency: int) -> list[Path]:
+    """
+    Synthesizes each text block into its own cached MP3, running up to `concurrency` blocks at once.
+    Blocks whose audio is already cached are not synthesized again.
+
+    Args:
+        blocks (list[str]): The text blocks to convert to speech.
+        voice (str): The voice to use for TTS.
+        concurrency (int): Maximum number of concurrent TTS requests.
+
+    Returns:
+        list[Path]: The audio file of every block, in the order of `blocks`.
+    """
+    if voice not in VOICES:
+        raise ValueError(f"Voice '{voice}' is not supported.")
+
+    import edge_tts
+
+    ensure_audio_dirs()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(block: str) -> Path:
+        block_path = BLOCK_DIR / audio_filename_for_hash(audio_content_hash(block, voice))
+        if block_path.exists():
+            # Mark the block as in use so the orphan sweep leaves it alone
+            os.utime(block_path)
+            return block_path
+        async with semaphore:
+            partial_path = BLOCK_DIR / f"{block_path.stem}.{uuid.uuid4().hex[:8]}.part"
+            communicate = edge_tts.Communicate(normalize_tts_text(block), voice)
+            await communicate.save(str(partial_path))
+            os.replace(partial_path, block_path)
+        return block_path
+
+    # Let every block finish so the successful ones stay cached for the next attempt
+    results = await asyncio.gather(*(render(block) for block in blocks), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def concatenate_audio(parts: list[Path], output_path: Path) -> Path:
+    """
+    Joins MP3 files into `output_path`. The file appears atomically once it is complete.
+    """
+    partial_path = output_path.with_name(f"{output_path.stem}.{uuid.uuid4().hex[:8]}.part")
+    with open(partial_path, "wb") as output:
+        for part in parts:
+            with open(part, "rb") as source:
+                shutil.copyfileobj(source, output)
+    os.replace(partial_path, output_path)
+    return output_path
+
+
+def lesson_audio_hash(blocks: list[str], voice: str) -> str:
+    """Content address of the audio made by concatenating `blocks`."""
+    block_hashes = [audio_content_hash(block, voice) for block in blocks]
+    return hashlib.sha256(json.dumps(block_hashes).encode("utf-8")).hexdigest()
+
+
+def normalize_tts_text(text: str) -> str:
+    """Collapse whitespace, which does not change the synthesized speech."""
+    return " ".join(text.split())
+
+
+def audio_content_hash(text: str, voice: str) -> str:
+    """
+    Content address of the audio for `text` spoken by `voice`.
+
+    Args:
+        text (str): The text to convert to speech.
+        voice (str): The voice to use for TTS.
+
+    Returns:
+        str: A SHA-256 hex digest of the normalized text, voice and TTS engine version.
+    """
+    raw = json.dumps([normalize_tts_text(text), voice, TTS_ENGINE_VERSION])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def audio_filename_for_hash(content_hash: str) -> str:
+    return f"{content_hash}.mp3"
+
+
+def block_path_for_hash(block_hash: str) -> str:
+    return str(BLOCK_DIR / audio_filename_for_hash(block_hash))
+
+
+def delete_audio_file(path: str):
+    """Remove an audio file, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from ..config import (
+    VERIFICATION_CODE_STORE,
+    VERIFICATION_CODE_TTL_SECONDS,
+    VERIFICATION_PURGE_INTERVAL_SECONDS,
+)
+from ..database.base import AsyncSessionLocal
+from ..repositories.users import AsyncUsersRepository
+from ..schemas.verification_code import VerificationCodeCreate
+from .code_generator import generate_verification_code
+
+logger = logging.getLogger(__name__)
+
+users_repository = AsyncUsersRepository()
+
+
+class VerificationCodeStore(ABC):
+    """
+    Issues single-use verification codes and checks them.
+    A code is valid for `ttl_seconds` and is consumed by a successful `verify`.
+    """
+
+    def __init__(self, ttl_seconds: int = VERIFICATION_CODE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def issue(self, verification_data: VerificationCodeCreate) -> str:
+        """Create a code for the email and purpose of `verification_data` and return it."""
+
+    @abstractmethod
+    async def verify(self, email: str, code: str, purpose: str) -> bool:
+        """Consume `code` if it is valid; False if it is unknown, used or expired."""
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """Delete expired codes and return how many were removed."""
+
+    async def sweep_forever(self, interval_seconds: float = VERIFICATION_PURGE_INTERVAL_SECONDS):
+        """Purge expired codes every `interval_seconds` until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                purged = await self.purge_expired()
+                if purged:
+                    logger.info(f"Purged {purged} expired verification code(s)")
+            except Exception as e:
+                logger.warning(f"Failed to purge expired verification codes: {str(e)}")
+
+
+class MemoryVerificationCodeStore(VerificationCodeStore):
+    """
+    In-process store for single-node deployments: a hash map from
+    (email, purpose, code) to its expiry, plus a min-heap of expiries so expired
+    codes are dropped in order without scanning the map. Codes do not survive a restart.
+    """
+
+    def __init__(self, ttl_seconds: int = VERIFICATION_CODE_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self._expiries = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    async def issue(self, verification_data: VerificationCodeCreate) -> str:
+        code = generate_verification_code()
+        key = (verification_data.email, verification_data.purpose, code)
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._purge(time.monotonic())
+            self._expiries[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+        return code
+
+    async def verify(self, email: str, code: str, purpose: str) -> bool:
+        with self._lock:
+            expires_at = self._expiries.pop((email, purpose, code), None)
+        return expires_at is not None and expires_at >= time.monotonic()
+
+    async def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge(time.monotonic())
+
+    def _purge(self, now: float) -> int:
+        purged = 0
+        while self._heap and self._heap[0][0] < now:
+            expires_at, key = heapq.heappop(self._heap)
+            # Skip heap entries for codes already verified or re-issued with a later expiry
+            if self._expiries.get(key) == expires_at:
+                del self._expiries[key]
+                purged += 1
+        return purged
+
+
+class DatabaseVerificationCodeStore(VerificationCodeStore):
+    """
+    Stores codes in the `verification_codes` table, so every app instance sees them.
+    Lookups go through the composite (email, purpose, code, expires_at) index;
+    the sweeper keeps the table down to codes that can still be used.
+    """
+
+    async def issue(self, verification_data: VerificationCodeCreate) -> str:
+        async with AsyncSessionLocal() as db:
+            verification_code = await users_repository.create_verification_code(
+                db, verification_data, self.ttl_seconds
+            )
+            return verification_code.code
+
+    async def verify(self, email: str, code: str, purpose: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            return await users_repository.verify_code(db, email, code, purpose)
+
+    async def purge_expired(self) -> int:
+        async with AsyncSessionLocal() as db:
+            return await users_repository.delete_expired_codes(db)
+
+
+VERIFICATION_CODE_STORES = {
+    "memory": MemoryVerificationCodeStore,
+    "database": DatabaseVerificationCodeStore,
+}
+
+
+def create_verification_code_store(kind: str = VERIFICATION_CODE_STORE) -> VerificationCodeStore:
+    if kind not in VERIFICATION_CODE_STORES:
+        raise ValueError(
+            f"Unknown VERIFICATION_CODE_STORE '{kind}'. Must be one of: {', '.join(VERIFICATION_CODE_STORES)}"
+        )
+    return VERIFICATION_CODE_STORES[kind]()
+
+
+verification_codes = create_verification_code_store()
@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+# app.config refuses to load without these; the tests never reach OpenAI or the mail server
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MAIL_USERNAME", "test@example.com")
+os.environ.setdefault("MAIL_PASSWORD", "test")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.models import Lesson, Question, Quiz, User
+from app.repositories.questions import AsyncQuestionsRepository
+from app.schemas.questions import QuestionCreate, QuestionUpdate
+from app.utils.answer_keys import AnswerKey, AnswerKeyCache, answer_keys
+
+questions = AsyncQuestionsRepository()
+
+QUIZ_ID = 1
+
+
+@pytest.fixture
+def async_session(tmp_path):
+    path = tmp_path / "answers.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(user_id=1, fullname="Ada", email="ada@example.com", password_hashed="x"))
+        db.add(Lesson(lesson_id=1, user_id=1, title="Lesson"))
+        db.add(Quiz(quiz_id=QUIZ_ID, lesson_id=1, title="Quiz"))
+        db.add(
+            Question(
+                question_id=1,
+                quiz_id=QUIZ_ID,
+                question_text="True?",
+                question_type="true_false",
+                correct_answer="True",
+            )
+        )
+        db.commit()
+    # The cache is shared with other tests that use the same quiz ID
+    answer_keys.invalidate(QUIZ_ID)
+    yield async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    answer_keys.invalidate(QUIZ_ID)
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+async def cached_key(async_session) -> AnswerKey:
+    async with async_session() as db:
+        answer_key = await questions.get_answer_key(db, QUIZ_ID)
+    assert answer_keys.get(QUIZ_ID) is answer_key
+    return answer_key
+
+
+def test_answer_key_checks_answers():
+    answer_key = AnswerKey([(1, "true_false", "True"), (2, "multiple_choice", "Paris")])
+
+    assert answer_key.check({1: "TRUE", 2: "paris", 3: "ignored"}) == [(1, "true", True), (2, "paris", False)]
+    assert answer_key.total_questions == 2
+
+
+@pytest.mark.anyio
+async def test_creating_a_question_invalidates_the_key(async_session):
+    await cached_key(async_session)
+
+    async with async_session() as db:
+        await questions.create_question(
+            db,
+            QUIZ_ID,
+            QuestionCreate(
+                question_text="Capital?",
+                question_type="multiple_choice",
+                options=["Paris", "Rome"],
+                correct_answer="Paris",
+            ),
+        )
+
+    assert answer_keys.get(QUIZ_ID) is None
+    assert (await cached_key(async_session)).total_questions == 2
+
+
+@pytest.mark.anyio
+async def test_updating_a_question_invalidates_the_key(async_session):
+    await cached_key(async_session)
+
+    async with async_session() as db:
+        question = await questions.get_question_by_id(db, 1)
+        await questions.update_question(db, question, QuestionUpdate(correct_answer="False"))
+
+    assert answer_keys.get(QUIZ_ID) is None
+    assert (await cached_key(async_session)).correct_answers == {1: "False"}
+
+
+@pytest.mark.anyio
+async def test_deleting_a_question_invalidates_the_key(async_session):
+    await cached_key(async_session)
+
+    async with async_session() as db:
+        await questions.delete_question(db, await questions.get_question_by_id(db, 1))
+
+    assert answer_keys.get(QUIZ_ID) is None
+
+
+def test_key_loaded_before_an_invalidation_is_not_cached():
+    cache = AnswerKeyCache()
+    generation = cache.generation()
+    # A question of another quiz changes while the key is loading
+    cache.invalidate(2)
+
+    cache.set(QUIZ_ID, AnswerKey([]), generation)
+    assert cache.get(QUIZ_ID) is None
+
+    cache.set(QUIZ_ID, AnswerKey([]), cache.generation())
+    assert cache.get(QUIZ_ID) is not None
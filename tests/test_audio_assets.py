@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.models import AudioAsset, AudioAssetBlock
+from app.repositories.audio import AudioAssetsRepository
+
+audio_assets = AudioAssetsRepository()
+
+CONTENT_HASH = "a" * 64
+BLOCK_HASH = "b" * 64
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audio.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def seed_asset(session_factory, ref_count: int):
+    with session_factory() as db:
+        db.add(AudioAsset(content_hash=CONTENT_HASH, file_path="audio_files/a.mp3", ref_count=ref_count))
+        db.add(AudioAssetBlock(content_hash=CONTENT_HASH, block_hash=BLOCK_HASH))
+        db.commit()
+
+
+def interleave(session_factory, change):
+    """
+    Run `change` in two sessions: the second starts while the first has changed the
+    asset but not committed yet. Returns both results.
+    """
+    results = {}
+    first = session_factory()
+    results["first"] = change(first)
+
+    def second():
+        with session_factory() as db:
+            results["second"] = change(db)
+            db.commit()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    # Let the second session read the asset and wait on the first one's write
+    time.sleep(0.2)
+    first.commit()
+    first.close()
+    thread.join(timeout=10)
+    return results
+
+
+def test_concurrent_removals_release_the_asset_once(session_factory):
+    seed_asset(session_factory, ref_count=2)
+
+    results = interleave(session_factory, lambda db: audio_assets.remove_reference(db, CONTENT_HASH))
+
+    released = [paths for paths in results.values() if paths]
+    assert len(released) == 1
+    assert released[0][0] == "audio_files/a.mp3"
+    assert len(released[0]) == 2
+    with session_factory() as db:
+        assert db.get(AudioAsset, CONTENT_HASH) is None
+        assert db.query(AudioAssetBlock).count() == 0
+
+
+def test_concurrent_additions_are_both_counted(session_factory):
+    seed_asset(session_factory, ref_count=1)
+
+    results = interleave(
+        session_factory, lambda db: audio_assets.add_reference(db, CONTENT_HASH, "audio_files/a.mp3")
+    )
+
+    assert sorted(results.values()) == [2, 3]
+    with session_factory() as db:
+        assert db.get(AudioAsset, CONTENT_HASH).ref_count == 3
+
+
+def test_remaining_reference_keeps_the_files(session_factory):
+    seed_asset(session_factory, ref_count=2)
+
+    with session_factory() as db:
+        assert audio_assets.remove_reference(db, CONTENT_HASH) == []
+        db.commit()
+        assert db.get(AudioAsset, CONTENT_HASH).ref_count == 1
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import AUDIO_RENDER_TIMEOUT_SECONDS
+from app.database.base import Base
+from app.database.models import Lesson, User
+from app.utils import audio_pipeline
+from app.utils.audio_pipeline import DEFAULT_VOICE, attach_audio, claim_render, fail_render
+from app.utils.tts import lesson_audio_hash
+
+CONTENT = [{"type": "text", "value": "Hello"}]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audio.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(user_id=1, fullname="Ada", email="ada@example.com", password_hashed="x"))
+        db.commit()
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def add_lesson(session_factory, audio_status="pending", started_seconds_ago=None) -> int:
+    with session_factory() as db:
+        lesson = Lesson(user_id=1, title="Lesson", content=CONTENT, audio_status=audio_status)
+        if started_seconds_ago is not None:
+            lesson.audio_render_started_at = datetime.utcnow() - timedelta(seconds=started_seconds_ago)
+        db.add(lesson)
+        db.commit()
+        return lesson.lesson_id
+
+
+def status_of(session_factory, lesson_id: int):
+    with session_factory() as db:
+        return db.get(Lesson, lesson_id).audio_status
+
+
+def test_render_is_claimed_once(session_factory):
+    lesson_id = add_lesson(session_factory)
+
+    with session_factory() as first, session_factory() as second:
+        assert claim_render(first, lesson_id)
+        assert not claim_render(second, lesson_id)
+    assert status_of(session_factory, lesson_id) == "rendering"
+
+
+def test_timed_out_render_can_be_claimed_again(session_factory):
+    live = add_lesson(session_factory, "rendering", started_seconds_ago=10)
+    dead = add_lesson(session_factory, "rendering", started_seconds_ago=AUDIO_RENDER_TIMEOUT_SECONDS + 1)
+
+    with session_factory() as db:
+        assert not claim_render(db, live)
+        assert claim_render(db, dead)
+
+
+@pytest.mark.parametrize("audio_status", ["ready", "failed", None])
+def test_lesson_without_pending_audio_is_not_claimed(session_factory, audio_status):
+    lesson_id = add_lesson(session_factory, audio_status, started_seconds_ago=AUDIO_RENDER_TIMEOUT_SECONDS + 1)
+
+    with session_factory() as db:
+        assert not claim_render(db, lesson_id)
+
+
+def test_resume_skips_live_renders(session_factory, monkeypatch):
+    pending = add_lesson(session_factory)
+    add_lesson(session_factory, "rendering", started_seconds_ago=10)
+    dead = add_lesson(session_factory, "rendering", started_seconds_ago=AUDIO_RENDER_TIMEOUT_SECONDS + 1)
+    resumed = []
+    monkeypatch.setattr(audio_pipeline, "SessionLocal", session_factory)
+    monkeypatch.setattr(audio_pipeline.audio_workers, "resume", lambda ids: resumed.extend(ids) or len(resumed))
+
+    assert audio_pipeline.resume_audio_renders() == 2
+    assert sorted(resumed) == [pending, dead]
+
+
+def test_audio_of_an_edited_lesson_is_not_attached(session_factory, tmp_path):
+    lesson_id = add_lesson(session_factory)
+    audio_path = tmp_path / "old.mp3"
+    audio_path.write_bytes(b"old")
+
+    with session_factory() as db:
+        claim_render(db, lesson_id)
+        # Edited while rendering: the lesson is pending again
+        lesson = db.get(Lesson, lesson_id)
+        lesson.content = [{"type": "text", "value": "Changed"}]
+        lesson.audio_status = "pending"
+        db.commit()
+
+        # False: the caller claims the lesson again and renders the new text
+        assert not attach_audio(db, lesson_id, lesson_audio_hash(["Hello"], DEFAULT_VOICE), str(audio_path), [])
+    assert status_of(session_factory, lesson_id) == "pending"
+    assert not audio_path.exists()
+
+
+def test_claimed_render_is_attached(session_factory, tmp_path):
+    lesson_id = add_lesson(session_factory)
+    audio_path = tmp_path / "hello.mp3"
+    audio_path.write_bytes(b"hello")
+
+    with session_factory() as db:
+        claim_render(db, lesson_id)
+        assert attach_audio(db, lesson_id, lesson_audio_hash(["Hello"], DEFAULT_VOICE), str(audio_path), [])
+    assert status_of(session_factory, lesson_id) == "ready"
+
+
+def test_failure_does_not_override_a_newer_edit(session_factory):
+    lesson_id = add_lesson(session_factory)
+
+    with session_factory() as db:
+        claim_render(db, lesson_id)
+        db.get(Lesson, lesson_id).audio_status = "pending"
+        db.commit()
+        fail_render(db, lesson_id)
+    assert status_of(session_factory, lesson_id) == "pending"
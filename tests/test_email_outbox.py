@@ -0,0 +1,195 @@
+import asyncio
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.utils.email_utils import EmailOutbox
+
+
+class RecordingHandler:
+    """
+    Accepts every message, after answering the first DATA commands with `replies`.
+    Recipients in `refused` are rejected.
+    """
+
+    def __init__(self, replies=(), refused=()):
+        self.replies = list(replies)
+        self.refused = set(refused)
+        self.messages = []
+        self.peers = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.replies:
+            return self.replies.pop(0)
+        self.messages.append(envelope)
+        self.peers.add(session.peer)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler):
+        controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+        servers.append(controller)
+        return controller
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def make_outbox(controller, batch_size: int = 20, max_attempts: int = 5) -> EmailOutbox:
+    return EmailOutbox(
+        hostname=controller.hostname,
+        port=controller.port,
+        username=None,
+        password=None,
+        start_tls=False,
+        sender="noreply@example.com",
+        batch_size=batch_size,
+        max_attempts=max_attempts,
+        retry_delay=0.01,
+        idle_timeout=60,
+    )
+
+
+async def wait_until(condition, timeout: float = 5):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_burst_is_sent_over_one_connection(smtp_server):
+    handler = RecordingHandler()
+    outbox = make_outbox(smtp_server(handler), batch_size=20)
+    try:
+        for number in range(50):
+            outbox.enqueue(f"user{number}@example.com", "Your code", f"Code {number}")
+        await wait_until(lambda: outbox.stats()["sent"] == 50)
+    finally:
+        await outbox.stop()
+
+    assert len(handler.messages) == 50
+    assert {envelope.rcpt_tos[0] for envelope in handler.messages} == {
+        f"user{number}@example.com" for number in range(50)
+    }
+    assert len(handler.peers) == 1
+    assert outbox.stats()["connections"] == 1
+
+
+@pytest.mark.anyio
+async def test_transient_failure_is_retried(smtp_server):
+    handler = RecordingHandler(replies=["451 Try again later", "451 Try again later"])
+    outbox = make_outbox(smtp_server(handler), max_attempts=3)
+    try:
+        outbox.enqueue("ada@example.com", "Your code", "Code 123456")
+        await wait_until(lambda: outbox.stats()["sent"] == 1)
+    finally:
+        await outbox.stop()
+
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [["ada@example.com"]]
+    assert outbox.stats()["retried"] == 2
+    assert outbox.stats()["failed"] == 0
+
+
+@pytest.mark.anyio
+async def test_gives_up_after_max_attempts(smtp_server):
+    handler = RecordingHandler(replies=["451 Try again later"] * 3)
+    outbox = make_outbox(smtp_server(handler), max_attempts=3)
+    try:
+        outbox.enqueue("ada@example.com", "Your code", "Code 123456")
+        await wait_until(lambda: outbox.stats()["failed"] == 1)
+    finally:
+        await outbox.stop()
+
+    assert handler.messages == []
+    assert handler.replies == []
+    assert outbox.stats()["retried"] == 2
+    assert outbox.stats()["retrying"] == 0
+
+
+@pytest.mark.anyio
+async def test_permanent_rejection_is_not_retried(smtp_server):
+    handler = RecordingHandler(replies=["550 Mailbox unavailable"])
+    outbox = make_outbox(smtp_server(handler))
+    try:
+        outbox.enqueue("nobody@example.com", "Your code", "Code 123456")
+        await wait_until(lambda: outbox.stats()["failed"] == 1)
+    finally:
+        await outbox.stop()
+
+    assert handler.messages == []
+    assert outbox.stats()["retried"] == 0
+
+
+@pytest.mark.anyio
+async def test_refused_recipient_is_not_retried(smtp_server):
+    handler = RecordingHandler(refused={"nobody@example.com"})
+    outbox = make_outbox(smtp_server(handler))
+    try:
+        outbox.enqueue("nobody@example.com", "Your code", "Code 123456")
+        outbox.enqueue("ada@example.com", "Your code", "Code 123456")
+        await wait_until(lambda: outbox.stats()["failed"] == 1 and outbox.stats()["sent"] == 1)
+    finally:
+        await outbox.stop()
+
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [["ada@example.com"]]
+    assert outbox.stats()["retried"] == 0
+
+
+@pytest.mark.anyio
+async def test_unbuildable_message_does_not_stop_the_worker(smtp_server):
+    handler = RecordingHandler()
+    outbox = make_outbox(smtp_server(handler))
+    try:
+        # A line break in a header is rejected while building the message
+        outbox.enqueue("ada@example.com", "Your\ncode", "Code 123456")
+        outbox.enqueue("ada@example.com", "Your code", "Code 654321")
+        await wait_until(lambda: outbox.stats()["sent"] == 1)
+    finally:
+        await outbox.stop()
+
+    assert outbox.stats()["failed"] == 1
+    assert len(handler.messages) == 1
+
+
+@pytest.mark.anyio
+async def test_failed_idle_disconnect_does_not_stop_the_worker(smtp_server):
+    handler = RecordingHandler()
+    outbox = make_outbox(smtp_server(handler))
+    outbox.idle_timeout = 0.1
+    try:
+        outbox.enqueue("ada@example.com", "Your code", "Code 1")
+        await wait_until(lambda: outbox.stats()["sent"] == 1)
+
+        async def quit():
+            raise OSError("connection reset")
+
+        outbox._smtp.quit = quit
+        await wait_until(lambda: not outbox.stats()["connected"])
+
+        outbox.enqueue("ada@example.com", "Your code", "Code 2")
+        await wait_until(lambda: outbox.stats()["sent"] == 2)
+    finally:
+        await outbox.stop()
+
+    assert outbox.stats()["connections"] == 2
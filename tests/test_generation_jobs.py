@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.models import GenerationJob, User
+from app.repositories.jobs import JobsRepository
+
+jobs = JobsRepository()
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(user_id=1, fullname="Ada", email="ada@example.com", password_hashed="x"))
+        db.commit()
+        yield db
+    engine.dispose()
+
+
+def add_job(db, status="queued", worker_id=None, attempts=0, age_seconds=0) -> int:
+    job = GenerationJob(
+        user_id=1,
+        learning_field="Math",
+        description="Sets",
+        status=status,
+        worker_id=worker_id,
+        attempts=attempts,
+        updated_at=datetime.utcnow() - timedelta(seconds=age_seconds),
+    )
+    db.add(job)
+    db.commit()
+    return job.job_id
+
+
+def status_of(db, job_id: int) -> tuple:
+    db.expire_all()
+    job = db.get(GenerationJob, job_id)
+    return job.status, job.worker_id
+
+
+def test_job_is_claimed_once(db):
+    job_id = add_job(db)
+
+    assert jobs.claim_job(db, job_id, "worker-a").worker_id == "worker-a"
+    assert jobs.claim_job(db, job_id, "worker-b") is None
+    assert status_of(db, job_id) == ("running", "worker-a")
+
+
+def test_running_job_with_a_live_lease_is_not_requeued(db):
+    job_id = add_job(db, status="running", worker_id="worker-a", attempts=1, age_seconds=10)
+
+    assert jobs.requeue_interrupted_jobs(db, LEASE_SECONDS, MAX_ATTEMPTS) == (0, 0)
+    assert status_of(db, job_id) == ("running", "worker-a")
+
+
+def test_job_with_an_expired_lease_is_requeued(db):
+    job_id = add_job(db, status="running", worker_id="worker-a", attempts=1, age_seconds=LEASE_SECONDS + 1)
+
+    assert jobs.requeue_interrupted_jobs(db, LEASE_SECONDS, MAX_ATTEMPTS) == (1, 0)
+    assert status_of(db, job_id) == ("queued", None)
+    assert jobs.get_queued_job_ids(db) == [job_id]
+
+
+def test_job_interrupted_too_often_fails(db):
+    job_id = add_job(
+        db, status="running", worker_id="worker-a", attempts=MAX_ATTEMPTS, age_seconds=LEASE_SECONDS + 1
+    )
+
+    assert jobs.requeue_interrupted_jobs(db, LEASE_SECONDS, MAX_ATTEMPTS) == (0, 1)
+    assert status_of(db, job_id)[0] == "failed"
+    assert jobs.get_queued_job_ids(db) == []
+
+
+def test_lease_belongs_to_the_claiming_worker(db):
+    job_id = add_job(db)
+    jobs.claim_job(db, job_id, "worker-a")
+
+    assert jobs.renew_lease(db, job_id, "worker-a")
+    assert not jobs.renew_lease(db, job_id, "worker-b")
+
+    # A worker that lost the job cannot record an outcome for it
+    jobs.mark_failed(db, job_id, "worker-b", "lost")
+    assert status_of(db, job_id) == ("running", "worker-a")
+    jobs.mark_succeeded(db, job_id, "worker-a", lesson_id=None)
+    assert status_of(db, job_id) == ("succeeded", "worker-a")
@@ -0,0 +1,66 @@
+import json
+
+from app.utils.json_stream import IncrementalJSONParser
+
+LESSON = {
+    "title": "Sets",
+    "description": "A \"quoted\" intro, with commas: {and braces}",
+    "content": [{"type": "paragraph", "text": "One"}, {"type": "paragraph", "text": "Two\\n"}],
+    "quiz": {"questions": [{"question_text": "True?", "correct_answer": True}, {"options": [1, 2.5, None]}]},
+}
+WATCH = [("title",), ("description",), ("content", "*"), ("quiz", "questions", "*"), ()]
+
+
+def feed_in_chunks(text: str, size: int, watch=WATCH) -> tuple[list, IncrementalJSONParser]:
+    parser = IncrementalJSONParser(watch=watch)
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed, parser
+
+
+def test_values_are_the_same_for_every_chunk_size():
+    text = json.dumps(LESSON)
+    expected = [
+        (("title",), "Sets"),
+        (("description",), LESSON["description"]),
+        (("content", 0), LESSON["content"][0]),
+        (("content", 1), LESSON["content"][1]),
+        (("quiz", "questions", 0), LESSON["quiz"]["questions"][0]),
+        (("quiz", "questions", 1), LESSON["quiz"]["questions"][1]),
+        ((), LESSON),
+    ]
+    for size in (1, 2, 7, len(text)):
+        completed, parser = feed_in_chunks(text, size)
+        assert completed == expected, size
+        assert parser.done
+
+
+def test_value_is_returned_by_the_chunk_that_completes_it():
+    parser = IncrementalJSONParser(watch=[("content", "*")])
+
+    assert parser.feed('{"content": [{"text": "O') == []
+    assert parser.feed('ne"}, {"te') == [(("content", 0), {"text": "One"})]
+    assert parser.feed('xt": "Two"}]}') == [(("content", 1), {"text": "Two"})]
+
+
+def test_scalar_is_complete_at_its_delimiter():
+    parser = IncrementalJSONParser(watch=[("count",), ("flag",)])
+
+    # "12" may continue in the next chunk
+    assert parser.feed('{"count": 12') == []
+    assert parser.feed('3, "flag": true') == [(("count",), 123)]
+    assert parser.feed("}") == [(("flag",), True)]
+
+
+def test_text_around_the_document_is_skipped():
+    completed, parser = feed_in_chunks('```json\n{"title": "Sets"}\n```', 4, watch=[("title",)])
+
+    assert completed == [(("title",), "Sets")]
+    assert parser.done
+
+
+def test_unwatched_values_are_not_returned():
+    completed, _ = feed_in_chunks(json.dumps(LESSON), 5, watch=[("quiz", "questions", "*", "options")])
+
+    assert completed == [(("quiz", "questions", 1, "options"), [1, 2.5, None])]
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils.audio_pipeline import audio_locations
+
+LESSON_ID = 4242
+
+
+@pytest.fixture
+def client(tmp_path):
+    audio_path = tmp_path / "lesson.mp3"
+    audio_path.write_bytes(b"first render")
+    # A known location answers without a database lookup
+    audio_locations.set(LESSON_ID, str(audio_path))
+    yield TestClient(create_app()), audio_path
+    audio_locations.invalidate(LESSON_ID)
+
+
+def test_audio_is_revalidated_before_reuse(client):
+    client, _ = client
+    response = client.get(f"/lessons/lessons/{LESSON_ID}/audio")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    revalidated = client.get(
+        f"/lessons/lessons/{LESSON_ID}/audio", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+
+def test_rerendered_audio_gets_a_new_etag(client):
+    client, audio_path = client
+    etag = client.get(f"/lessons/lessons/{LESSON_ID}/audio").headers["etag"]
+
+    audio_path.write_bytes(b"second render")
+
+    response = client.get(f"/lessons/lessons/{LESSON_ID}/audio", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == b"second render"
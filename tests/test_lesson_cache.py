@@ -0,0 +1,92 @@
+import pytest
+
+from app.utils import lesson_cache as lesson_cache_module
+from app.utils.lesson_cache import LessonCache, make_cache_key
+
+TTL_SECONDS = 100
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lesson_cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs) -> LessonCache:
+        cache = LessonCache(str(tmp_path / "lessons.db"), ttl_seconds=TTL_SECONDS, **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_trivially_different_prompts_share_a_key():
+    assert make_cache_key("Set  Theory", "Basics\n", "gpt", 1) == make_cache_key("set theory", " basics", "gpt", 1)
+    assert make_cache_key("Set Theory", "Basics", "gpt", 1) != make_cache_key("Set Theory", "Basics", "gpt", 2)
+
+
+def test_hits_are_counted_by_tier(clock, make_cache):
+    cache = make_cache()
+    cache.set("a", "lesson a")
+
+    assert cache.get("a") == "lesson a"
+    assert cache.get("b") is None
+    # Another worker on the host only has the disk tier
+    assert make_cache().get("a") == "lesson a"
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"], stats["stores"]) == (1, 0, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_entries_expire_in_both_tiers(clock, make_cache):
+    cache = make_cache()
+    cache.set("a", "lesson a")
+
+    clock.now += TTL_SECONDS - 1
+    assert cache.get("a") == "lesson a"
+    clock.now += 1
+    assert cache.get("a") is None
+    assert make_cache().get("a") is None
+
+
+def test_memory_tier_falls_back_to_disk(clock, make_cache):
+    cache = make_cache(memory_size=1)
+    cache.set("a", "lesson a")
+    cache.set("b", "lesson b")
+
+    assert cache.get("a") == "lesson a"
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_entries"] == 1
+
+
+def test_disk_tier_drops_the_least_recently_used(clock, make_cache):
+    cache = make_cache(memory_size=0, disk_size=2)
+    cache.set("a", "lesson a")
+    clock.now += 1
+    cache.set("b", "lesson b")
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == "lesson a"
+    clock.now += 1
+    cache.set("c", "lesson c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "lesson a"
+    assert cache.get("c") == "lesson c"
+    assert cache.stats()["disk_entries"] == 2
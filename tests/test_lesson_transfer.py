@@ -0,0 +1,44 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils.lesson_transfer import _lines, parse_lesson_trees
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+@pytest.mark.anyio
+async def test_lines_are_joined_across_chunks():
+    lines = await collect(_lines(stream(b"ab", b"c\nd", b"e\n\nf"), max_line_bytes=10))
+    assert lines == [(1, b"abc"), (2, b"de"), (3, b""), (4, b"f")]
+
+
+@pytest.mark.anyio
+async def test_long_line_inside_a_chunk_is_rejected():
+    # The long line ends inside the chunk, so it is never the unfinished tail
+    with pytest.raises(HTTPException) as error:
+        await collect(_lines(stream(b"ok\n" + b"x" * 11 + b"\nok\n"), max_line_bytes=10))
+    assert error.value.status_code == 413
+    assert error.value.detail == "Line 2 is longer than 10 bytes"
+
+
+@pytest.mark.anyio
+async def test_long_unfinished_line_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        await collect(_lines(stream(b"ok\n", b"x" * 6, b"x" * 6), max_line_bytes=10))
+    assert error.value.detail == "Line 2 is longer than 10 bytes"
+
+
+@pytest.mark.anyio
+async def test_invalid_lesson_names_its_line():
+    body = b'{"title": "One"}\n\n{"title": 5}\n'
+    with pytest.raises(HTTPException) as error:
+        await collect(parse_lesson_trees(stream(body)))
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith("Invalid lesson on line 3:")
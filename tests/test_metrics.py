@@ -0,0 +1,24 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.utils.security import create_jwt_token
+
+METRICS = ["/metrics/database", "/metrics/passwords", "/metrics/email", "/metrics/answer-keys", "/metrics/responses"]
+
+
+@pytest.fixture
+def client():
+    # Without the lifespan, so no workers or background tasks are started
+    return TestClient(create_app())
+
+
+@pytest.mark.parametrize("path", METRICS)
+def test_metrics_require_a_token(client, path):
+    assert client.get(path).status_code == 401
+
+
+@pytest.mark.parametrize("path", METRICS)
+def test_metrics_are_served_to_signed_in_users(client, path):
+    response = client.get(path, headers={"Authorization": f"Bearer {create_jwt_token(1)}"})
+    assert response.status_code == 200
@@ -0,0 +1,241 @@
+"""
+Query plans of the repository lookups.
+
+Each lookup calls the real repository method (or ownership dependency) against a
+small SQLite database with the current schema. Every SELECT, UPDATE and DELETE it
+sends is then explained with `EXPLAIN QUERY PLAN`, and the test fails if one reads
+a whole table instead of searching an index.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.models import (
+    AudioAsset,
+    AudioAssetBlock,
+    GenerationJob,
+    Lesson,
+    Question,
+    QuestionAnswerStats,
+    QuestionStats,
+    Quiz,
+    QuizStats,
+    User,
+    VerificationCode,
+)
+from app.repositories.attempts import AsyncQuizAttemptsRepository
+from app.repositories.audio import AudioAssetsRepository
+from app.repositories.jobs import AsyncJobsRepository, JobsRepository
+from app.repositories.lessons import AsyncLessonsRepository, LessonsRepository
+from app.repositories.questions import AsyncQuestionsRepository, QuestionsRepository
+from app.repositories.quizzes import AsyncQuizzesRepository, QuizzesRepository
+from app.repositories.users import AsyncUsersRepository, UsersRepository
+from app.utils import audio_pipeline
+from app.utils.answer_keys import answer_keys
+from app.utils.ownership import get_owned_lesson, get_owned_question, get_owned_quiz
+from app.utils.response_cache import response_cache, user_scope
+
+lessons = AsyncLessonsRepository()
+quizzes = AsyncQuizzesRepository()
+questions = AsyncQuestionsRepository()
+attempts = AsyncQuizAttemptsRepository()
+users = AsyncUsersRepository()
+jobs = AsyncJobsRepository()
+sync_lessons = LessonsRepository()
+sync_quizzes = QuizzesRepository()
+sync_questions = QuestionsRepository()
+sync_users = UsersRepository()
+sync_jobs = JobsRepository()
+audio_assets = AudioAssetsRepository()
+
+
+async def _consume_lesson_trees(db):
+    async for _ in lessons.iter_lesson_trees(db, 1, batch_size=2):
+        pass
+
+
+async def _get_answer_key(db):
+    # A cached key would answer without a query
+    answer_keys.invalidate(1)
+    await questions.get_answer_key(db, 1)
+
+
+# Lookups of the request handlers, run on an AsyncSession
+ASYNC_LOOKUPS = {
+    "AsyncLessonsRepository.get_lesson_by_id": lambda db: lessons.get_lesson_by_id(db, 1),
+    "AsyncLessonsRepository.get_lesson_tree": lambda db: lessons.get_lesson_tree(db, 1),
+    "AsyncLessonsRepository.get_user_lessons": lambda db: lessons.get_user_lessons(db, 1, cursor=1, limit=50),
+    "AsyncLessonsRepository.get_lesson_payload_row": lambda db: lessons.get_lesson_payload_row(db, 1),
+    "AsyncLessonsRepository.get_user_lesson_payload_rows": lambda db: lessons.get_user_lesson_payload_rows(
+        db, 1, cursor=1, limit=50
+    ),
+    "AsyncLessonsRepository.get_user_lesson_summaries": lambda db: lessons.get_user_lesson_summaries(
+        db, 1, cursor=1, limit=50
+    ),
+    "AsyncLessonsRepository.get_last_position": lambda db: lessons.get_last_position(db, 1),
+    "AsyncLessonsRepository.iter_lesson_trees": _consume_lesson_trees,
+    "AsyncQuizzesRepository.get_quiz_by_id": lambda db: quizzes.get_quiz_by_id(db, 1),
+    "AsyncQuizzesRepository.get_lesson_quiz": lambda db: quizzes.get_lesson_quiz(db, 1),
+    "AsyncQuestionsRepository.get_question_by_id": lambda db: questions.get_question_by_id(db, 1),
+    "AsyncQuestionsRepository.get_quiz_questions": lambda db: questions.get_quiz_questions(db, 1),
+    "AsyncQuestionsRepository.get_answer_key": _get_answer_key,
+    "AsyncQuizAttemptsRepository.get_quiz_stats": lambda db: attempts.get_quiz_stats(db, 1),
+    "AsyncUsersRepository.get_user_by_email": lambda db: users.get_user_by_email(db, "ada@example.com"),
+    "AsyncUsersRepository.get_user_by_id": lambda db: users.get_user_by_id(db, 1),
+    "AsyncUsersRepository.verify_code": lambda db: users.verify_code(db, "ada@example.com", "123456", "login"),
+    "AsyncUsersRepository.delete_expired_codes": lambda db: users.delete_expired_codes(db),
+    "AsyncJobsRepository.get_job_by_id": lambda db: jobs.get_job_by_id(db, 1),
+    "get_owned_lesson": lambda db: get_owned_lesson(lesson_id=1, user_id=1, db=db),
+    "get_owned_quiz": lambda db: get_owned_quiz(quiz_id=1, user_id=1, db=db),
+    "get_owned_question": lambda db: get_owned_question(question_id=1, user_id=1, db=db),
+    "ResponseCache.version": lambda db: response_cache.version(db, user_scope(1)),
+}
+
+# Lookups of the generation and audio workers, run on a Session
+SYNC_LOOKUPS = {
+    "LessonsRepository.get_lesson_by_id": lambda db: sync_lessons.get_lesson_by_id(db, 1),
+    "LessonsRepository.get_user_lessons": lambda db: sync_lessons.get_user_lessons(db, 1),
+    "LessonsRepository.get_last_position": lambda db: sync_lessons.get_last_position(db, 1),
+    "QuizzesRepository.get_quiz_by_id": lambda db: sync_quizzes.get_quiz_by_id(db, 1),
+    "QuizzesRepository.get_lesson_quiz": lambda db: sync_quizzes.get_lesson_quiz(db, 1),
+    "QuestionsRepository.get_question_by_id": lambda db: sync_questions.get_question_by_id(db, 1),
+    "QuestionsRepository.get_quiz_questions": lambda db: sync_questions.get_quiz_questions(db, 1),
+    "UsersRepository.get_user_by_email": lambda db: sync_users.get_user_by_email(db, "ada@example.com"),
+    "UsersRepository.get_user_by_id": lambda db: sync_users.get_user_by_id(db, 1),
+    "JobsRepository.get_job_by_id": lambda db: sync_jobs.get_job_by_id(db, 1),
+    "JobsRepository.get_queued_job_ids": lambda db: sync_jobs.get_queued_job_ids(db),
+    "JobsRepository.requeue_interrupted_jobs": lambda db: sync_jobs.requeue_interrupted_jobs(db, 300, 3),
+    "JobsRepository.claim_job": lambda db: sync_jobs.claim_job(db, 1, "worker"),
+    "JobsRepository.renew_lease": lambda db: sync_jobs.renew_lease(db, 1, "worker"),
+    "AudioAssetsRepository.get_existing_path": lambda db: audio_assets.get_existing_path(db, "a" * 64),
+    "AudioAssetsRepository.get_tracked_blocks": lambda db: audio_assets.get_tracked_blocks(db, ["b" * 64]),
+    "AudioAssetsRepository.remove_reference": lambda db: audio_assets.remove_reference(db, "a" * 64),
+}
+
+
+def seed(db):
+    now = datetime.utcnow()
+    db.add(User(user_id=1, fullname="Ada", email="ada@example.com", password_hashed="x"))
+    for lesson_id in (1, 2, 3):
+        db.add(
+            Lesson(
+                lesson_id=lesson_id,
+                user_id=1,
+                title=f"Lesson {lesson_id}",
+                position=lesson_id,
+                content=[{"type": "paragraph", "text": "Hello"}],
+                audio_status="pending",
+            )
+        )
+    db.add(Quiz(quiz_id=1, lesson_id=1, title="Quiz"))
+    db.add(
+        Question(
+            question_id=1,
+            quiz_id=1,
+            question_text="True?",
+            question_type="true_false",
+            options=["true", "false"],
+            correct_answer="true",
+        )
+    )
+    db.add(QuizStats(quiz_id=1, attempt_count=1, answer_count=1, correct_count=1))
+    db.add(QuestionStats(question_id=1, quiz_id=1, attempt_count=1, correct_count=1))
+    db.add(QuestionAnswerStats(question_id=1, answer="true", quiz_id=1, count=1))
+    db.add(
+        VerificationCode(
+            email="ada@example.com", code="123456", purpose="login", expires_at=now + timedelta(minutes=5)
+        )
+    )
+    db.add(GenerationJob(job_id=1, user_id=1, learning_field="Math", description="Sets"))
+    db.add(AudioAsset(content_hash="a" * 64, file_path="audio_files/a.mp3", ref_count=1))
+    db.add(AudioAsset(content_hash="c" * 64, file_path="audio_files/c.mp3", ref_count=1))
+    db.add(AudioAssetBlock(content_hash="a" * 64, block_hash="b" * 64))
+    db.add(AudioAssetBlock(content_hash="c" * 64, block_hash="b" * 64))
+    db.commit()
+
+
+@pytest.fixture
+def engines(tmp_path):
+    path = tmp_path / "plans.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        seed(db)
+    yield engine, async_engine
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+def capture_statements(*engines) -> list[tuple]:
+    """Collect the SELECT, UPDATE and DELETE statements sent through `engines`, with their parameters."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def full_scans(engine, statement: str, parameters) -> list[str]:
+    """Plan lines of `statement` that read a whole table instead of searching an index."""
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).fetchall()
+    # Rows are (id, parent, notused, detail). Some SQLite versions report an
+    # unindexed aggregate as a bare "SEARCH <table>"; "SCAN CONSTANT ROW" reads no table.
+    return [
+        row[3] for row in plan
+        if (row[3].startswith("SCAN") and row[3] != "SCAN CONSTANT ROW")
+        or (row[3].startswith("SEARCH") and " USING " not in row[3])
+    ]
+
+
+def assert_indexed(engine, statements):
+    assert statements, "the lookup sent no query"
+    scans = {statement: full_scans(engine, statement, parameters) for statement, parameters in statements}
+    assert not {statement: lines for statement, lines in scans.items() if lines}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", list(ASYNC_LOOKUPS))
+async def test_async_lookup_uses_an_index(engines, name):
+    engine, async_engine = engines
+    statements = capture_statements(async_engine.sync_engine)
+    async with async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        try:
+            await ASYNC_LOOKUPS[name](db)
+        except HTTPException:
+            # Ownership and "not found" checks run after the query
+            pass
+    assert_indexed(engine, statements)
+
+
+@pytest.mark.parametrize("name", list(SYNC_LOOKUPS))
+def test_sync_lookup_uses_an_index(engines, name):
+    engine, _ = engines
+    statements = capture_statements(engine)
+    with sessionmaker(bind=engine)() as db:
+        try:
+            SYNC_LOOKUPS[name](db)
+        except HTTPException:
+            pass
+    assert_indexed(engine, statements)
+
+
+def test_resume_audio_renders_uses_an_index(engines, monkeypatch):
+    engine, _ = engines
+    resumed = []
+    monkeypatch.setattr(audio_pipeline, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(audio_pipeline.audio_workers, "resume", lambda ids: resumed.extend(ids) or len(resumed))
+    statements = capture_statements(engine)
+
+    assert audio_pipeline.resume_audio_renders() == 3
+    assert_indexed(engine, statements)
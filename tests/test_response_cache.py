@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.utils import response_cache
+from app.utils.response_cache import ResponseCache, cached_response, user_scope
+
+SCOPE = user_scope(1)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    path = tmp_path / "responses.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine), async_sessionmaker(async_engine, class_=AsyncSession)
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+async def cache_body(cache: ResponseCache, db, body: bytes):
+    cache.set("lessons", await cache.version(db, SCOPE), body)
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+
+@pytest.mark.anyio
+async def test_unchanged_response_is_revalidated_without_loading(sessions, tmp_path):
+    _, async_session = sessions
+    key = ("lessons", str(tmp_path))
+    loads = []
+
+    async def load() -> bytes:
+        loads.append(1)
+        return b'[{"title": "Sets"}]'
+
+    async with async_session() as db:
+        first = await cached_response(request(), db, key, SCOPE, load)
+        revalidated = await cached_response(request(if_none_match=first.headers["etag"]), db, key, SCOPE, load)
+
+    assert first.status_code == 200 and first.body == b'[{"title": "Sets"}]'
+    assert revalidated.status_code == 304 and revalidated.body == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert len(loads) == 1
+
+
+@pytest.mark.anyio
+async def test_bumped_scope_is_loaded_again(sessions, tmp_path):
+    _, async_session = sessions
+    key = ("lessons", str(tmp_path))
+    bodies = iter([b'["old"]', b'["new"]'])
+
+    async def load() -> bytes:
+        return next(bodies)
+
+    async with async_session() as db:
+        first = await cached_response(request(), db, key, SCOPE, load)
+        await response_cache.response_cache.bump_async(db, SCOPE)
+        await db.commit()
+        changed = await cached_response(request(if_none_match=first.headers["etag"]), db, key, SCOPE, load)
+
+    assert changed.status_code == 200 and changed.body == b'["new"]'
+    assert changed.headers["etag"] != first.headers["etag"]
+
+
+@pytest.mark.anyio
+async def test_write_in_another_worker_makes_the_response_stale(sessions):
+    _, async_session = sessions
+    # Each worker process has its own cache; the versions are shared through the database
+    first, second = ResponseCache(), ResponseCache()
+    async with async_session() as db:
+        await cache_body(first, db, b"old")
+
+    async with async_session() as db:
+        await second.bump_async(db, SCOPE)
+        await db.commit()
+
+    async with async_session() as db:
+        assert first.get("lessons", await first.version(db, SCOPE)) is None
+
+
+@pytest.mark.anyio
+async def test_sync_writer_bumps_the_same_version(sessions):
+    session, async_session = sessions
+    cache = ResponseCache()
+    async with async_session() as db:
+        await cache_body(cache, db, b"old")
+
+    with session() as db:
+        cache.bump(db, SCOPE, SCOPE)
+        db.commit()
+
+    async with async_session() as db:
+        assert await cache.version(db, SCOPE) == 1
+        assert cache.get("lessons", 1) is None
+
+
+@pytest.mark.anyio
+async def test_rolled_back_write_keeps_the_response(sessions):
+    _, async_session = sessions
+    cache = ResponseCache()
+    async with async_session() as db:
+        await cache_body(cache, db, b"body")
+
+    async with async_session() as db:
+        await cache.bump_async(db, SCOPE)
+        await db.rollback()
+
+    async with async_session() as db:
+        assert cache.get("lessons", await cache.version(db, SCOPE)).body == b"body"
+
+
+def test_response_read_before_a_write_does_not_replace_a_newer_one():
+    cache = ResponseCache()
+    cache.set("lessons", 2, b"new")
+    cache.set("lessons", 1, b"old")
+
+    assert cache.get("lessons", 2).body == b"new"
+
+
+@pytest.mark.anyio
+async def test_compression_runs_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def compress(body, encoding):
+        threads.append(threading.get_ident())
+        return body[::-1]
+
+    monkeypatch.setattr(response_cache, "compress", compress)
+    entry = ResponseCache().set("lessons", 0, b"body")
+
+    assert await entry.variant_async("gzip") == (b"ydob", f'{entry.etag[:-1]}-gzip"')
+    assert await entry.variant_async("gzip") == (b"ydob", f'{entry.etag[:-1]}-gzip"')
+    assert threads and threads[0] != threading.get_ident()
+    # Compressed once, then served from the entry
+    assert len(threads) == 1